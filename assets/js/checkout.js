@@ -0,0 +1,75 @@
+// Update totals when shipping method changes
+document.querySelectorAll('input[name="shipping_method"]').forEach(radio => {
+    radio.addEventListener('change', function() {
+        const cost = this.dataset.cost;
+        const total = this.dataset.total;
+        const deliveryTime = this.closest('.shipping-option').querySelector('.text-muted').textContent.trim();
+
+        // Update shipping cost
+        const shippingCostEl = document.getElementById('shipping-cost');
+        if (cost == '0.00') {
+            shippingCostEl.innerHTML = '<span class="badge bg-success">FREE</span>';
+        } else {
+            shippingCostEl.textContent = '£' + cost;
+        }
+
+        // Update total
+        const totalFloat = parseFloat(total);
+        document.getElementById('total-amount').textContent = '£' + totalFloat.toFixed(2);
+
+        // Update partial payment amounts
+        updatePaymentBreakdown(totalFloat);
+
+        // Update delivery time
+        document.getElementById('delivery-time').textContent = deliveryTime.replace('⏱ ', '');
+
+        // Highlight selected option
+        document.querySelectorAll('.shipping-option').forEach(opt => {
+            opt.classList.remove('border-primary');
+        });
+        this.closest('.shipping-option').classList.add('border-primary');
+    });
+});
+
+// Update payment breakdown
+function updatePaymentBreakdown(total) {
+    const halfAmount = (total / 2).toFixed(2);
+    document.getElementById('partial-amount').textContent = '£' + halfAmount;
+    document.getElementById('remaining-amount').textContent = '£' + halfAmount;
+
+    const paymentMethod = document.querySelector('input[name="payment_method"]:checked').value;
+    if (paymentMethod === 'partial') {
+        document.getElementById('pay-now-amount').innerHTML = '<strong>£' + halfAmount + '</strong>';
+        document.getElementById('pay-later-amount').innerHTML = '<strong>£' + halfAmount + ' (cash)</strong>';
+    } else {
+        document.getElementById('pay-now-amount').innerHTML = '<strong>£' + total.toFixed(2) + '</strong>';
+        document.getElementById('pay-later-amount').innerHTML = '<strong>£0.00</strong>';
+    }
+}
+
+// Highlight selected payment method and show/hide breakdown
+document.querySelectorAll('input[name="payment_method"]').forEach(radio => {
+    radio.addEventListener('change', function() {
+        document.querySelectorAll('.payment-option').forEach(opt => {
+            opt.classList.remove('border-success', 'border-primary');
+        });
+
+        const breakdownDiv = document.getElementById('payment-breakdown');
+        const total = parseFloat(document.getElementById('total-amount').textContent.replace('£', ''));
+
+        if (this.value === 'partial') {
+            this.closest('.payment-option').classList.add('border-success');
+            breakdownDiv.style.display = 'block';
+            updatePaymentBreakdown(total);
+        } else {
+            this.closest('.payment-option').classList.add('border-primary');
+            breakdownDiv.style.display = 'none';
+        }
+    });
+});
+
+// Initialize on page load
+document.addEventListener('DOMContentLoaded', function() {
+    const total = parseFloat(document.getElementById('total-amount').textContent.replace('£', ''));
+    updatePaymentBreakdown(total);
+});
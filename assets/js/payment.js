@@ -0,0 +1,105 @@
+// Order details come from data attributes on the form, so this file can be cached
+const form = document.getElementById('payment-form');
+const submitButton = document.getElementById('submit-button');
+const payLabel = submitButton.innerHTML;
+
+// Initialize Stripe
+const stripe = Stripe(form.dataset.stripeKey);
+const elements = stripe.elements();
+
+// Create card element
+const cardElement = elements.create('card', {
+    style: {
+        base: {
+            fontSize: '16px',
+            color: '#32325d',
+            fontFamily: '-apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, sans-serif',
+            '::placeholder': {
+                color: '#aab7c4'
+            }
+        },
+        invalid: {
+            color: '#dc3545',
+            iconColor: '#dc3545'
+        }
+    }
+});
+
+cardElement.mount('#card-element');
+
+// Handle validation errors
+cardElement.on('change', function(event) {
+    const displayError = document.getElementById('card-errors');
+    if (event.error) {
+        displayError.textContent = event.error.message;
+    } else {
+        displayError.textContent = '';
+    }
+});
+
+// Handle form submission
+form.addEventListener('submit', async function(event) {
+    event.preventDefault();
+
+    // Disable button and show loading
+    submitButton.disabled = true;
+    submitButton.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Processing Payment...';
+
+    try {
+        // Get client secret from server
+        const response = await fetch(form.action, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': form.elements.csrfmiddlewaretoken.value
+            }
+        });
+
+        const data = await response.json();
+
+        if (data.error) {
+            throw new Error(data.error);
+        }
+
+        // Confirm payment with Stripe
+        const result = await stripe.confirmCardPayment(data.clientSecret, {
+            payment_method: {
+                card: cardElement,
+                billing_details: {
+                    name: form.dataset.name,
+                    email: form.dataset.email
+                }
+            }
+        });
+
+        if (result.error) {
+            // Show error
+            const errorElement = document.getElementById('card-errors');
+            errorElement.textContent = result.error.message;
+
+            // Re-enable button
+            submitButton.disabled = false;
+            submitButton.innerHTML = payLabel;
+        } else {
+            // Payment successful
+            if (result.paymentIntent.status === 'succeeded') {
+                // Show success message
+                submitButton.innerHTML = '<i class="fas fa-check-circle"></i> Payment Successful!';
+                submitButton.classList.remove('btn-success');
+                submitButton.classList.add('btn-primary');
+
+                // Redirect after short delay
+                setTimeout(function() {
+                    window.location.href = form.dataset.successUrl;
+                }, 1500);
+            }
+        }
+    } catch (error) {
+        const errorElement = document.getElementById('card-errors');
+        errorElement.textContent = error.message;
+
+        // Re-enable button
+        submitButton.disabled = false;
+        submitButton.innerHTML = payLabel;
+    }
+});
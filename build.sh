@@ -3,5 +3,16 @@ set -o errexit
 
 pip install -r requirements.txt
 
+./check_budgets.sh
+
+# Settings refuse to load in production without a shared cache (see SHARED_CACHE in
+# settings.py). These build steps never use it; createcachetable still creates the
+# table when SHARED_CACHE_TABLE is set.
+if [ -z "$SHARED_CACHE_DIR" ] && [ -z "$SHARED_CACHE_TABLE" ]; then
+    export SHARED_CACHE_DIR=/tmp/leather-shop-cache
+fi
+
+python manage.py build_assets
 python manage.py collectstatic --no-input
 python manage.py migrate
+python manage.py createcachetable
@@ -9,11 +9,9 @@ class Cart:
     def __init__(self, request):
         """Initialize the cart"""
         self.session = request.session
-        cart = self.session.get(settings.CART_SESSION_ID)
-        if not cart:
-            # Save an empty cart in the session
-            cart = self.session[settings.CART_SESSION_ID] = {}
-        self.cart = cart
+        # An empty cart is only stored on the first save, so browsing alone
+        # never writes a session row
+        self.cart = self.session.get(settings.CART_SESSION_ID) or {}
     
     def add(self, product, size, quantity=1, override_quantity=False):
         """Add a product to the cart or update its quantity"""
@@ -36,7 +34,8 @@ class Cart:
         self.save()
     
     def save(self):
-        """Mark the session as modified"""
+        """Store the cart and mark the session as modified"""
+        self.session[settings.CART_SESSION_ID] = self.cart
         self.session.modified = True
     
     def remove(self, product_id, size):
@@ -70,8 +69,9 @@ class Cart:
     
     def clear(self):
         """Remove cart from session"""
-        del self.session[settings.CART_SESSION_ID]
-        self.save()
+        self.session.pop(settings.CART_SESSION_ID, None)
+        self.cart = {}
+        self.session.modified = True
     
     def get_items(self):
         """Get all items with product details"""
@@ -6,11 +6,13 @@ from .cart import Cart
 from .forms import CartAddProductForm
 from django.conf import settings
 from decimal import Decimal
+from leather_shop.metrics import checkout_step
 
 
 def cart_detail(request):
     """Display cart contents"""
     cart = Cart(request)
+    checkout_step('cart_viewed')
     
     # Calculate totals
     subtotal = sum(Decimal(str(item['price'])) * item['quantity'] for item in cart)
@@ -53,6 +55,7 @@ def cart_add(request, product_id):
             override_quantity=cd['override']
         )
         messages.success(request, f'{product.name} added to your cart!')
+        checkout_step('cart_add')
     else:
         messages.error(request, 'Please select a valid size and quantity.')
     
@@ -0,0 +1,12 @@
+#!/usr/bin/env bash
+# Build step: fail if any page's query count grows with the data or goes over its
+# budget (manage.py check_query_budgets). Runs against a throwaway SQLite database,
+# never the production one, with DEBUG on so no static manifest is needed yet.
+set -o errexit
+
+scratch=$(mktemp -d)
+trap 'rm -rf "$scratch"' EXIT
+
+export DEBUG=1 DATABASE_URL="sqlite:///$scratch/db.sqlite3" REPLICA_DATABASE_URLS=
+python manage.py migrate --no-input --verbosity 0
+python manage.py check_query_budgets
@@ -0,0 +1,62 @@
+"""
+Production gunicorn settings, read automatically from the project root.
+
+The app is preloaded in the master and warmed there (imports, URLs,
+templates) before forking, then each worker fills its own database
+connection pools and caches before taking traffic; see leather_shop.warmup.
+Set WARM_UP=0 to skip both and compare cold starts.
+"""
+import glob
+import os
+import time
+
+started = time.perf_counter()
+
+wsgi_app = 'leather_shop.asgi:application'
+worker_class = 'uvicorn.workers.UvicornWorker'
+bind = f'0.0.0.0:{os.environ.get("PORT", "8000")}'
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+
+preload_app = True
+
+# Recycle workers to bound memory growth; the jitter keeps them from restarting together
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = max_requests // 10
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+WARM_UP = os.environ.get('WARM_UP', '1') != '0'
+
+
+def on_starting(server):
+    # Values from the previous run would otherwise be summed into /metrics
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        for path in glob.glob(os.path.join(directory, '*.db')):
+            os.remove(path)
+
+
+def when_ready(server):
+    from leather_shop.warmup import log_timings, warm_master
+
+    timings = [('load app', time.perf_counter() - started)]
+    if WARM_UP:
+        timings += warm_master()
+    log_timings('Master', timings)
+
+
+def post_worker_init(worker):
+    if not WARM_UP:
+        return
+    from leather_shop.warmup import log_timings, warm_worker
+
+    log_timings(f'Worker {worker.pid}', warm_worker())
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
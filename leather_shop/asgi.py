@@ -3,8 +3,18 @@ ASGI config for leather_shop project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+This is the production entry point: gunicorn manages the worker
+processes and each one runs uvicorn's event loop (see gunicorn.conf.py),
+
+    gunicorn --config gunicorn.conf.py
+
+so the async catalogue and payment views can wait on the database and
+Stripe without tying up a worker per request. For local development,
+`uvicorn leather_shop.asgi:application --reload` does the same in one
+process. leather_shop.wsgi still works for plain sync workers.
+
 For more information on this file, see
-https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
 import os
@@ -13,4 +23,4 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'leather_shop.settings')
 
-application = get_asgi_application()
\ No newline at end of file
+application = get_asgi_application()
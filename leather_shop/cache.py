@@ -0,0 +1,198 @@
+"""
+Tiered application cache for catalogue and report data.
+
+L1 is a small LRU in each process; L2 is the "shared" Django cache, which
+every worker reads (file-based in production, a per-process locmem stand-in
+in development and tests). A value's key carries the current version of
+each of its tags, so invalidate('catalogue') makes every dependent value
+unreachable at once; products.signals bumps the tags when the models
+change. Other processes pick up a new tag version within
+APP_CACHE_TAG_TTL seconds.
+
+Expired values are kept in L2 for a grace period: the first caller past
+the expiry takes a lease and recomputes while everyone else keeps serving
+the stale copy. On a cold key, threads of one process wait for the one
+computing it, and other processes wait on the lease for up to LEASE_WAIT
+seconds, so a hot key expiring mid-sale is computed once, not once per
+request.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+from .db_router import primary_reads
+from .metrics import CACHE_LOOKUPS, CACHE_RECOMPUTES
+
+# How long a lease holder has to recompute before another caller may try
+LEASE_TIMEOUT = 30
+# How long a caller with nothing to serve waits for another process's lease
+LEASE_WAIT = 5
+LEASE_POLL = 0.05
+
+_missing = object()
+
+
+class LRUCache:
+    """Bounded, thread-safe in-process cache with a timeout per entry"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return default
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self.entries[key]
+                return default
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + timeout)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+l1 = LRUCache(settings.APP_CACHE_L1_ENTRIES)
+
+# Striped locks for in-process single flight: bounded, unlike a lock per key
+_locks = [threading.Lock() for _ in range(64)]
+
+
+def shared():
+    return caches['shared']
+
+
+def make_key(prefix, *parts):
+    """`prefix` plus a digest of `parts`, safe as a cache key whatever the parts hold"""
+    digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    return f'{prefix}:{digest}'
+
+
+def tag_versions(tags):
+    """Current version of each tag: the time.time_ns() it was last invalidated, or first seen"""
+    versions = {}
+    missing = []
+    for tag in tags:
+        version = l1.get(f'tag:{tag}')
+        if version is None:
+            missing.append(tag)
+        else:
+            versions[tag] = version
+    if missing:
+        found = shared().get_many([f'tag:{tag}' for tag in missing])
+        for tag in missing:
+            version = found.get(f'tag:{tag}')
+            if version is None:
+                shared().add(f'tag:{tag}', time.time_ns(), timeout=None)
+                version = shared().get(f'tag:{tag}')
+            l1.set(f'tag:{tag}', version, settings.APP_CACHE_TAG_TTL)
+            versions[tag] = version
+    return [versions[tag] for tag in tags]
+
+
+def invalidate(*tags):
+    """Make every value cached under any of `tags` unreachable"""
+    for tag in tags:
+        # A timestamp rather than a counter: versions never repeat, even if L2 is flushed
+        shared().set(f'tag:{tag}', time.time_ns(), timeout=None)
+        l1.delete(f'tag:{tag}')
+
+
+def get_or_set(key, compute, timeout, tags=(), grace=None):
+    """
+    The cached value for `key`, calling `compute()` to fill it. The value is
+    fresh for `timeout` seconds and served stale for `grace` more (default:
+    `timeout` again) while one caller recomputes it.
+    """
+    versions = tag_versions(tags)
+    full_key = ':'.join([key, *map(str, versions)])
+    grace = timeout if grace is None else grace
+    # Just after a write a replica may not have it yet; recompute from the primary
+    if versions and time.time_ns() - max(versions) < settings.REPLICA_STICKY_SECONDS * 1e9:
+        compute = primary_reads()(compute)
+
+    envelope = lookup(full_key)
+    if envelope is not _missing:
+        value, fresh_until = envelope
+        if time.time() < fresh_until or not shared().add(f'{full_key}:lease', 1, LEASE_TIMEOUT):
+            return value
+        return refresh(key, full_key, compute, timeout, grace, 'stale')
+
+    with _locks[hash(full_key) % len(_locks)]:
+        # Another thread may have filled it while this one waited
+        envelope = lookup(full_key)
+        if envelope is not _missing:
+            return envelope[0]
+        if not shared().add(f'{full_key}:lease', 1, LEASE_TIMEOUT):
+            envelope = wait_for(full_key)
+            if envelope is not _missing:
+                return envelope[0]
+        return refresh(key, full_key, compute, timeout, grace, 'cold')
+
+
+aget_or_set = sync_to_async(get_or_set)
+
+
+def lookup(full_key):
+    """(value, fresh until) from L1, else L2; only fresh values are kept in L1"""
+    envelope = l1.get(full_key, _missing)
+    CACHE_LOOKUPS.labels('app:l1', 'miss' if envelope is _missing else 'hit').inc()
+    if envelope is not _missing:
+        return envelope
+    envelope = shared().get(full_key, _missing)
+    CACHE_LOOKUPS.labels('app:l2', 'miss' if envelope is _missing else 'hit').inc()
+    if envelope is not _missing:
+        remaining = envelope[1] - time.time()
+        if remaining > 0:
+            l1.set(full_key, envelope, remaining)
+    return envelope
+
+
+def wait_for(full_key):
+    """Poll L2 while another process computes `full_key`"""
+    deadline = time.monotonic() + LEASE_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(LEASE_POLL)
+        envelope = shared().get(full_key, _missing)
+        if envelope is not _missing:
+            return envelope
+    return _missing
+
+
+def refresh(key, full_key, compute, timeout, grace, reason):
+    CACHE_RECOMPUTES.labels(key.split(':')[0], reason).inc()
+    try:
+        value = compute()
+        envelope = (value, time.time() + timeout)
+        shared().set(full_key, envelope, timeout + grace)
+        l1.set(full_key, envelope, timeout)
+        return value
+    finally:
+        shared().delete(f'{full_key}:lease')
+
+
+def clear():
+    """Empty both tiers (management commands and benchmarks)"""
+    l1.clear()
+    shared().clear()
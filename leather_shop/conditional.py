@@ -0,0 +1,89 @@
+"""
+Conditional GET for HTML pages.
+
+A view builds the ETag for its page from cheap version data (the cache tag
+versions behind the catalogue pages, see leather_shop.cache, or an order's
+updated_at) and asks not_modified() before loading or rendering anything;
+only when that gives no 304 does it build the page, then with_validator()
+marks the response.
+
+Every page also carries per-visitor chrome (the account menu, the cart
+badge, flashed messages, CSRF tokens), so the ETag covers the user, the
+basket and the CSRF cookie as well, and there is none at all while a
+message is waiting to be shown. For the same reason there is no
+Last-Modified: a date cannot say the basket changed. Responses are
+"private, no-cache": browsers keep the page and revalidate it every time,
+shared caches do not store it.
+
+The templates and the static manifest are part of every ETag, so a deploy
+that changes how pages look changes their validators too.
+"""
+import hashlib
+from functools import cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.dispatch import receiver
+from django.template.utils import get_app_template_dirs
+from django.utils.autoreload import file_changed
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+
+@cache
+def release():
+    """Digest of the templates and static manifest this process renders with"""
+    digest = hashlib.md5(usedforsecurity=False)
+    dirs = [path for engine in settings.TEMPLATES for path in engine.get('DIRS', [])]
+    files = [path for root in [*dirs, *get_app_template_dirs('templates')] for path in root.rglob('*')]
+    files.append(settings.STATIC_ROOT / 'staticfiles.json')
+    for path in sorted(files):
+        if path.is_file():
+            digest.update(str(path).encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+@receiver(file_changed, dispatch_uid='conditional_release')
+def template_edited(sender, file_path, **kwargs):
+    # runserver reloads templates without restarting; let the validators follow
+    release.cache_clear()
+
+
+def page_etag(request, *versions):
+    """ETag for a page built from `versions`, as this visitor sees it; None if it must be rendered"""
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    # Rendering shows (and so clears) pending messages; a 304 would lose them
+    storage = getattr(request, '_messages', None)
+    if storage is not None and len(storage):
+        return None
+    user = request.user
+    state = (
+        release(),
+        versions,
+        user.pk,
+        user.get_username(),
+        user.is_staff,
+        request.session.get(settings.CART_SESSION_ID),
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME),
+    )
+    return f'"{hashlib.md5(repr(state).encode(), usedforsecurity=False).hexdigest()}"'
+
+
+# The user, session and messages are read with the sync ORM
+apage_etag = sync_to_async(page_etag)
+
+
+def not_modified(request, etag):
+    """A 304 (or 412) if the client's copy matches `etag`, else None"""
+    if etag is None:
+        return None
+    return get_conditional_response(request, etag=etag)
+
+
+def with_validator(response, etag):
+    """Mark a page (or its 304) with its ETag, to be revalidated on every use"""
+    if etag is not None and response.status_code in (200, 304):
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,122 @@
+"""
+Read replicas for the catalogue and reporting.
+
+Reads go to a replica only inside replica_reads(): the catalogue views,
+the sales report and the order export use it. Checkout, payment, the
+Stripe webhook, the admin and everything else read the primary. Inside
+replica_reads() the primary is still used:
+
+- for sessions and users, read on every request, so a login or logout
+  shows at once;
+- for the rest of a request once it has written anything;
+- for a visitor who sent a POST (or any unsafe request) in the last
+  REPLICA_STICKY_SECONDS: ReplicaPinMiddleware pins them with a cookie, so
+  a just-submitted review or a new basket line is read back from where it
+  was written;
+- for recomputing cached values whose tags were invalidated that
+  recently (see leather_shop.cache), so replica lag is never cached.
+
+Without REPLICA_DATABASE_URLS there are no replicas and every query goes
+to the primary. To try it locally, copy db.sqlite3 and point
+REPLICA_DATABASE_URLS at the copy (sqlite:////path/to/replica.sqlite3);
+the copy behaves like a replica that stopped replicating.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+REPLICAS = [alias for alias in settings.DATABASES if alias.startswith('replica_')]
+
+# Apps read on every request that must never lag behind a write
+PRIMARY_APPS = {'sessions', 'auth'}
+
+PIN_COOKIE = 'primary_pin'
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Let the queries inside read from a replica"""
+    token = _replica_reads.set(enabled and bool(REPLICAS))
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def primary_reads():
+    """Read the primary inside, even within replica_reads()"""
+    return replica_reads(False)
+
+
+def replica_view(view):
+    """Decorator for read-only views: reads go to a replica unless the visitor is pinned"""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            with replica_reads(PIN_COOKIE not in request.COOKIES):
+                return await view(request, *args, **kwargs)
+    else:
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            with replica_reads(PIN_COOKIE not in request.COOKIES):
+                return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Sends reads inside replica_reads() to a random replica, everything else to the primary"""
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and model._meta.app_label not in PRIMARY_APPS:
+            return random.choice(REPLICAS)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        # Read your own writes for the rest of this request (or task)
+        _replica_reads.set(False)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema by replication
+        return db == 'default'
+
+
+class ReplicaPinMiddleware:
+    """Pin a visitor to the primary for REPLICA_STICKY_SECONDS after any unsafe request"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.pin(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.pin(request, await self.get_response(request))
+
+    def pin(self, request, response):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE'):
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_STICKY_SECONDS,
+                secure=request.is_secure(), httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,187 @@
+"""
+Serving MEDIA_ROOT (product images) in production.
+
+Files are streamed in blocks and never read whole: under WSGI through
+FileResponse, which the server can hand to sendfile(), and under ASGI
+through an async iterator (Django reads a sync file iterator into memory
+before sending it over ASGI). With MEDIA_ACCEL set, Django only checks the
+request and answers with an X-Accel-Redirect (nginx) or X-Sendfile
+(Apache, lighttpd) header, and the proxy sends the bytes.
+
+Responses carry an ETag and Last-Modified, answer If-None-Match and
+If-Modified-Since with 304, and serve a single Range (honouring If-Range)
+with 206. Names with a content hash, which HashedMediaStorage gives every
+new upload, are cached for a year as immutable; other files for
+MEDIA_MAX_AGE seconds.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import stat
+from pathlib import Path
+from urllib.parse import quote
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+ACCEL_MODES = ['x-accel-redirect', 'x-sendfile']
+if settings.MEDIA_ACCEL and settings.MEDIA_ACCEL not in ACCEL_MODES:
+    raise ImproperlyConfigured(f'MEDIA_ACCEL must be one of {", ".join(ACCEL_MODES)}, or empty.')
+
+CHUNK_SIZE = 64 * 1024
+
+# "photo.3f9a2c41b07e.jpg": the name changes whenever the bytes do
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class HashedMediaStorage(FileSystemStorage):
+    """Saves uploads as <name>.<content hash><ext>; identical uploads share one file"""
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest = hashlib.md5(usedforsecurity=False)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        root, ext = os.path.splitext(name)
+        name = f'{root}.{digest.hexdigest()[:12]}{ext}'
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
+
+
+def parse_range(header, size):
+    """(start, end) inclusive for a single byte range, None to ignore it, or False if unsatisfiable"""
+    match = RANGE.match(header)
+    if not match or match.groups() == ('', ''):
+        # Multiple ranges or other units: a full response is allowed
+        return None
+    first, last = match.groups()
+    if not first:
+        suffix = int(last)
+        return (max(size - suffix, 0), size - 1) if suffix and size else False
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        return False
+    return (start, end) if start <= end else None
+
+
+def if_range_matches(request, etag, last_modified):
+    if_range = request.headers.get('If-Range')
+    if if_range is None:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def read_blocks(path, start, length):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            block = file.read(min(CHUNK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+async def aread_blocks(path, start, length):
+    with open(path, 'rb') as file:
+        read = sync_to_async(file.read, thread_sensitive=False)
+        file.seek(start)
+        while length > 0:
+            block = await read(min(CHUNK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+def stream_file(request, path, size, content_type, start=0, end=None):
+    """Stream bytes start..end (inclusive) of the file at `path` without holding it in memory"""
+    end = size - 1 if end is None else end
+    length = end - start + 1
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(aread_blocks(path, start, length), content_type=content_type)
+    elif length == size:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    else:
+        response = StreamingHttpResponse(read_blocks(path, start, length), content_type=content_type)
+    response['Content-Length'] = str(length)
+    return response
+
+
+def accel_response(path, fullpath, content_type):
+    """Headers only: the proxy sends the file, and answers Range itself"""
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_ACCEL == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(path)
+    else:
+        response['X-Sendfile'] = str(fullpath)
+    return response
+
+
+def range_response(request, fullpath, size, content_type, byte_range):
+    """The whole file (byte_range None), one range of it, or 416 (byte_range False)"""
+    if byte_range is None:
+        return stream_file(request, fullpath, size, content_type)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    start, end = byte_range
+    response = stream_file(request, fullpath, size, content_type, start, end)
+    response.status_code = 206
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """A file under MEDIA_ROOT, with validators, ranges and (optionally) proxy offload"""
+    try:
+        fullpath = Path(safe_join(settings.MEDIA_ROOT, path))
+        stats = fullpath.stat()
+    except (SuspiciousFileOperation, OSError):
+        raise Http404('No such file.')
+    if not stat.S_ISREG(stats.st_mode):
+        raise Http404('No such file.')
+
+    size = stats.st_size
+    last_modified = int(stats.st_mtime)
+    etag = f'"{size:x}-{stats.st_mtime_ns:x}"'
+    content_type = mimetypes.guess_type(fullpath.name)[0] or 'application/octet-stream'
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None and settings.MEDIA_ACCEL:
+        response = accel_response(path, fullpath, content_type)
+    elif response is None:
+        byte_range = None
+        if 'Range' in request.headers and if_range_matches(request, etag, last_modified):
+            byte_range = parse_range(request.headers['Range'], size)
+        response = range_response(request, fullpath, size, content_type, byte_range)
+        response['Accept-Ranges'] = 'bytes'
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if HASHED_NAME.search(path):
+        patch_cache_control(response, public=True, max_age=365 * 24 * 60 * 60, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=settings.MEDIA_MAX_AGE)
+    return response
@@ -0,0 +1,194 @@
+"""
+Prometheus metrics for the shop, served at /metrics.
+
+Under gunicorn every worker is a separate process, so set
+PROMETHEUS_MULTIPROC_DIR to an empty, shared directory before starting
+the server (and clear it on each deploy): prometheus_client then keeps
+each process's values in mmap'd files there and /metrics sums them.
+Without it, metrics are per process, which is fine for runserver.
+"""
+import hmac
+import os
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.mail.backends.smtp import EmailBackend
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+from .query_profiler import awrap_queries, wrap_queries
+from .warmup import WARMUP_MARKER
+
+REQUEST_LATENCY = Histogram(
+    'django_http_request_duration_seconds',
+    'Time to produce a response, by URL name',
+    ['view', 'method', 'status'],
+)
+REQUEST_QUERIES = Histogram(
+    'django_http_request_db_queries',
+    'Database queries per request, by URL name',
+    ['view'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144),
+)
+REQUEST_DB_TIME = Histogram(
+    'django_http_request_db_duration_seconds',
+    'Time spent in the database per request, by URL name',
+    ['view'],
+)
+CACHE_LOOKUPS = Counter(
+    'django_cache_lookups_total',
+    'Cache lookups, by cache alias and hit or miss',
+    ['cache', 'result'],
+)
+CACHE_RECOMPUTES = Counter(
+    'app_cache_recomputes_total',
+    'Tiered cache values recomputed, by key prefix and whether a stale copy was being served',
+    ['key', 'reason'],
+)
+EXTERNAL_CALLS = Histogram(
+    'external_call_duration_seconds',
+    'Outbound calls to Stripe and the mail server',
+    ['service', 'operation', 'outcome'],
+)
+CHECKOUT_FUNNEL = Counter(
+    'checkout_funnel_total',
+    'Customers reaching each checkout step',
+    ['step'],
+)
+
+CHECKOUT_STEPS = [
+    'cart_add',
+    'cart_viewed',
+    'checkout_started',
+    'order_created',
+    'payment_started',
+    'payment_succeeded',
+]
+
+
+def checkout_step(step):
+    CHECKOUT_FUNNEL.labels(step).inc()
+
+
+@contextmanager
+def observe_call(service, operation):
+    """Time an outbound call; the outcome label is 'error' if it raised"""
+    started = time.perf_counter()
+    outcome = 'ok'
+    try:
+        yield
+    except Exception:
+        outcome = 'error'
+        raise
+    finally:
+        EXTERNAL_CALLS.labels(service, operation, outcome).observe(time.perf_counter() - started)
+
+
+class MetricsMiddleware:
+    """Latency, query count and database time for every request, labelled by URL name"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if request.META.get(WARMUP_MARKER):
+            return self.get_response(request)
+        db = QueryTotals()
+        started = time.perf_counter()
+        with wrap_queries(db):
+            response = self.get_response(request)
+        self.observe(request, response, db, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        if request.META.get(WARMUP_MARKER):
+            return await self.get_response(request)
+        db = QueryTotals()
+        started = time.perf_counter()
+        async with awrap_queries(db):
+            response = await self.get_response(request)
+        self.observe(request, response, db, time.perf_counter() - started)
+        return response
+
+    def observe(self, request, response, db, elapsed):
+        match = request.resolver_match
+        view = match.view_name if match else '<unmatched>'
+        REQUEST_LATENCY.labels(view, request.method, f'{response.status_code // 100}xx').observe(elapsed)
+        REQUEST_QUERIES.labels(view).observe(db.queries)
+        REQUEST_DB_TIME.labels(view).observe(db.duration)
+
+
+class QueryTotals:
+    """execute_wrapper callable that counts and times the queries of one request"""
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.queries += 1
+
+
+def metrics_view(request):
+    """Prometheus text exposition; needs METRICS_TOKEN as a bearer token, or a staff login"""
+    token = settings.METRICS_TOKEN
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not (request.user.is_staff or (token and hmac.compare_digest(supplied, token))):
+        return HttpResponseForbidden()
+
+    registry = REGISTRY
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+class MeteredCacheMixin:
+    """
+    Counts hits and misses for a Django cache backend, labelled by its
+    LOCATION. BaseCache.get_many() goes through get(), so it is counted too.
+    """
+    _missing = object()
+
+    def __init__(self, location, params):
+        self.metrics_alias = location or 'default'
+        super().__init__(location, params)
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, self._missing, version)
+        hit = value is not self._missing
+        CACHE_LOOKUPS.labels(self.metrics_alias, 'hit' if hit else 'miss').inc()
+        return value if hit else default
+
+
+class MeteredLocMemCache(MeteredCacheMixin, LocMemCache):
+    pass
+
+
+class MeteredEmailBackend(EmailBackend):
+    """SMTP backend that records connect and send latency"""
+
+    def open(self):
+        with observe_call('smtp', 'connect'):
+            return super().open()
+
+    def send_messages(self, email_messages):
+        with observe_call('smtp', 'send'):
+            return super().send_messages(email_messages)
+
@@ -0,0 +1,36 @@
+"""
+Blocking outbound I/O (Stripe, SMTP) off the request path.
+
+stripe 7.x and smtplib only have blocking clients, so async views await
+them on a dedicated thread pool instead of the event loop, and emails are
+handed to the same pool without waiting at all. Work sent here must not
+touch the database: load everything it needs first.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Sized for threads that mostly wait on the network, not for CPU
+executor = ThreadPoolExecutor(max_workers=settings.OUTBOUND_IO_THREADS, thread_name_prefix='outbound')
+
+
+def run_outbound(func):
+    """Async wrapper that runs the blocking `func` on the outbound pool"""
+    return sync_to_async(func, thread_sensitive=False, executor=executor)
+
+
+def submit_outbound(func, *args, **kwargs):
+    """Run `func` in the background, logging rather than raising its errors"""
+    future = executor.submit(func, *args, **kwargs)
+    future.add_done_callback(log_failure)
+    return future
+
+
+def log_failure(future):
+    exception = future.exception()
+    if exception is not None:
+        logger.error('Background outbound call failed', exc_info=exception)
@@ -0,0 +1,175 @@
+"""
+Per-request query profiling and N+1 detection.
+
+QueryProfilerMiddleware wraps every database connection with
+connection.execute_wrapper() for a sample of requests. It counts queries,
+times them and groups them by SQL fingerprint; a fingerprint repeated
+within one request is the signature of an N+1. Each profiled response
+carries a Server-Timing header, and requests over the QUERY_PROFILER_*
+thresholds are logged (or raise, for the test suite).
+"""
+import logging
+import random
+import re
+import sys
+import time
+from collections import Counter
+from contextlib import ExitStack, asynccontextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# "IN (%s, %s, %s)" and "IN (%s)" are the same query with a different page of ids
+IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+LITERAL = re.compile(r"'[^']*'|\b\d+\b")
+
+# Frames under here (outside site-packages) are reported as the query's origin
+PROJECT_ROOT = str(settings.BASE_DIR) + '/'
+
+
+class QueryProfileExceeded(Exception):
+    """A request went over the query profiler thresholds with QUERY_PROFILER_RAISE on"""
+
+
+def fingerprint(sql):
+    """Collapse literals and IN lists so repeats of one query compare equal"""
+    return LITERAL.sub('?', IN_LIST.sub('IN (...)', sql))
+
+
+def find_origin():
+    """The innermost template line and project source line behind the current query"""
+    template = source = None
+    frame = sys._getframe(2)
+    while frame is not None and not (template and source):
+        code = frame.f_code
+        if template is None and code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            origin = getattr(node, 'origin', None)
+            token = getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                template = f'{origin.template_name}:{token.lineno}'
+        elif source is None and code.co_filename.startswith(PROJECT_ROOT) and code.co_filename != __file__ \
+                and 'site-packages' not in code.co_filename:
+            source = f'{code.co_filename[len(PROJECT_ROOT):]}:{frame.f_lineno} in {code.co_name}'
+        frame = frame.f_back
+    return ' / '.join(part for part in (template, source) if part) or 'unknown'
+
+
+def wrap_queries(wrapper):
+    """Install `wrapper` on this thread's connections; the returned ExitStack removes it"""
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(wrapper))
+    return stack
+
+
+@asynccontextmanager
+async def awrap_queries(wrapper):
+    """
+    wrap_queries() for async middleware. Connections are per thread, so the
+    wrapper goes on those of the thread the request's sync code and the
+    ORM run in (one per request under ASGI), not the event loop's.
+    """
+    stack = await sync_to_async(wrap_queries)(wrapper)
+    try:
+        yield
+    finally:
+        await sync_to_async(stack.close)()
+
+
+class QueryProfile:
+    """execute_wrapper callable that records the queries of one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+        self.origins = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        key = fingerprint(sql)
+        self.fingerprints[key] += 1
+        # Only repeats pay for a stack walk
+        if self.fingerprints[key] == 2:
+            self.origins[key] = find_origin()
+
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+    def duplicates(self, threshold):
+        """(count, fingerprint, origin) for every query repeated at least `threshold` times"""
+        return [
+            (count, key, self.origins.get(key, 'unknown'))
+            for key, count in self.fingerprints.most_common()
+            if count >= threshold
+        ]
+
+
+class QueryProfilerMiddleware:
+    """Profile a sample of requests; see the module docstring"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.QUERY_PROFILER_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if random.random() >= settings.QUERY_PROFILER_SAMPLE_RATE:
+            return self.get_response(request)
+
+        profile = QueryProfile()
+        started = time.perf_counter()
+        with wrap_queries(profile):
+            response = self.get_response(request)
+        return self.finish(request, response, profile, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        if random.random() >= settings.QUERY_PROFILER_SAMPLE_RATE:
+            return await self.get_response(request)
+
+        profile = QueryProfile()
+        started = time.perf_counter()
+        async with awrap_queries(profile):
+            response = await self.get_response(request)
+        return self.finish(request, response, profile, time.perf_counter() - started)
+
+    def finish(self, request, response, profile, elapsed):
+        response['Server-Timing'] = (
+            f'db;dur={profile.duration * 1000:.1f};desc="{profile.count} queries", '
+            f'app;dur={elapsed * 1000:.1f}'
+        )
+        self.check_thresholds(request, profile)
+        return response
+
+    def check_thresholds(self, request, profile):
+        problems = []
+        if profile.count > settings.QUERY_PROFILER_MAX_QUERIES:
+            problems.append(f'{profile.count} queries (limit {settings.QUERY_PROFILER_MAX_QUERIES})')
+        if profile.duration * 1000 > settings.QUERY_PROFILER_MAX_DB_MS:
+            problems.append(f'{profile.duration * 1000:.0f}ms in the database (limit {settings.QUERY_PROFILER_MAX_DB_MS}ms)')
+        for count, key, origin in profile.duplicates(settings.QUERY_PROFILER_MAX_DUPLICATES):
+            problems.append(f'possible N+1, {count} x {key[:200]} from {origin}')
+        if not problems:
+            return
+
+        match = request.resolver_match
+        view = match.view_name if match else request.path
+        message = f'{request.method} {request.path} ({view}): ' + '; '.join(problems)
+        if settings.QUERY_PROFILER_RAISE:
+            raise QueryProfileExceeded(message)
+        logger.warning(message)
@@ -6,6 +6,7 @@ from pathlib import Path
 import os
 import dj_database_url
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -47,13 +48,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'leather_shop.query_profiler.QueryProfilerMiddleware',  # Outermost, to see every query
+    'leather_shop.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # Must be after SecurityMiddleware
+    'leather_shop.staticfiles.AsyncWhiteNoiseMiddleware',  # Must be after SecurityMiddleware
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'leather_shop.db_router.ReplicaPinMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -63,8 +67,15 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Compile each template once per process, in development too (runserver's
+            # autoreloader clears it when a template changes)
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -85,7 +96,7 @@ if config('DATABASE_URL', default=None):
     DATABASES = {
         'default': dj_database_url.config(
             default=config('DATABASE_URL'),
-            conn_max_age=600,
+            conn_max_age=0,
             conn_health_checks=True,
         )
     }
@@ -98,6 +109,32 @@ else:
         }
     }
 
+# Read replicas for catalogue and reporting reads (leather_shop.db_router): comma-separated
+# database URLs. A visitor is kept on the primary for REPLICA_STICKY_SECONDS after a write.
+REPLICA_DATABASE_URLS = [url for url in config('REPLICA_DATABASE_URLS', default='').split(',') if url]
+for number, url in enumerate(REPLICA_DATABASE_URLS, 1):
+    DATABASES[f'replica_{number}'] = {
+        **dj_database_url.parse(url, conn_max_age=0, conn_health_checks=True),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['leather_shop.db_router.ReplicaRouter']
+
+# Under ASGI each request runs its ORM calls in a new thread, so a persistent connection
+# (CONN_MAX_AGE) is never reused: every request would open one more and leave it idle.
+# Connections are closed after each request and handed back to a psycopg pool per worker
+# process and database instead. Set DATABASE_POOL=0 when PgBouncer does the pooling.
+DATABASE_POOL = config('DATABASE_POOL', default=True, cast=bool)
+DATABASE_POOL_OPTIONS = {
+    'min_size': config('DATABASE_POOL_MIN_SIZE', default=2, cast=int),
+    'max_size': config('DATABASE_POOL_MAX_SIZE', default=10, cast=int),
+    # Seconds a request waits for a free connection before failing
+    'timeout': config('DATABASE_POOL_TIMEOUT', default=10, cast=float),
+}
+for database in DATABASES.values():
+    if DATABASE_POOL and database['ENGINE'] == 'django.db.backends.postgresql':
+        database.setdefault('OPTIONS', {})['pool'] = DATABASE_POOL_OPTIONS
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=10, cast=int)
+
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -128,13 +165,42 @@ STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [BASE_DIR / 'static'] if (BASE_DIR / 'static').exists() else []
 
-# Whitenoise for serving static files
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# The site's CSS and JS. `manage.py build_assets` minifies them into ASSETS_BUILD_DIR
+# (build.sh runs it before collectstatic); until then the sources are served as they are.
+ASSETS_DIR = BASE_DIR / 'assets'
+ASSETS_BUILD_DIR = BASE_DIR / 'build' / 'assets'
+STATICFILES_DIRS.append(ASSETS_BUILD_DIR if ASSETS_BUILD_DIR.exists() else ASSETS_DIR)
+
+# Whitenoise serves the collected files under content-hashed names with far-future
+# caching, and their gzip and brotli versions (compressed at collectstatic)
+STORAGES = {
+    # Uploads get content-hashed names, so leather_shop.media can cache them for good
+    'default': {
+        'BACKEND': 'leather_shop.media.HashedMediaStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+    # PDF invoices, by content hash and outside MEDIA_ROOT (they hold customer details).
+    # generate_invoices writes them and the web process reads them, so both must see the
+    # same storage: a shared volume or object storage when they run on different hosts.
+    'invoices': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        'OPTIONS': {'location': config('INVOICE_ROOT', default=str(BASE_DIR / 'invoices'))},
+    },
+}
 
 # Media files (User uploaded images)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# leather_shop.media serves MEDIA_ROOT. Behind nginx, set MEDIA_ACCEL=x-accel-redirect and map
+# an internal MEDIA_ACCEL_PREFIX location onto MEDIA_ROOT; x-sendfile suits Apache and lighttpd.
+MEDIA_ACCEL = config('MEDIA_ACCEL', default='')
+MEDIA_ACCEL_PREFIX = config('MEDIA_ACCEL_PREFIX', default='/internal-media/')
+# Browser caching for media without a content hash in its name (hashed names: a year)
+MEDIA_MAX_AGE = config('MEDIA_MAX_AGE', default=24 * 60 * 60, cast=int)
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -152,10 +218,19 @@ LOGIN_URL = 'users:login'
 # Stripe settings
 STRIPE_SECRET_KEY = config('STRIPE_SECRET_KEY')
 STRIPE_PUBLISHABLE_KEY = config('STRIPE_PUBLISHABLE_KEY')
+# Signs the webhook requests; an empty secret would verify signatures made with an empty key
 STRIPE_WEBHOOK_SECRET = config('STRIPE_WEBHOOK_SECRET', default='')
+if not STRIPE_WEBHOOK_SECRET and not DEBUG:
+    raise ImproperlyConfigured('Set STRIPE_WEBHOOK_SECRET: the Stripe webhook cannot be verified without it.')
+
+# Stripe HTTP client (point STRIPE_API_BASE at `manage.py stripe_stub_server` for local testing)
+STRIPE_API_BASE = config('STRIPE_API_BASE', default='https://api.stripe.com')
+STRIPE_CONNECT_TIMEOUT = config('STRIPE_CONNECT_TIMEOUT', default=3.05, cast=float)
+STRIPE_READ_TIMEOUT = config('STRIPE_READ_TIMEOUT', default=10, cast=float)
+STRIPE_MAX_NETWORK_RETRIES = config('STRIPE_MAX_NETWORK_RETRIES', default=2, cast=int)
 
 # Email settings
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_BACKEND = 'leather_shop.metrics.MeteredEmailBackend'  # SMTP, plus latency metrics
 EMAIL_HOST = config('EMAIL_HOST', default='smtp.gmail.com')
 EMAIL_PORT = config('EMAIL_PORT', default=587, cast=int)
 EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
@@ -163,6 +238,9 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default=f'UK Leather Jackets <{EMAIL_HOST_USER}>')
 
+# Threads for blocking Stripe and SMTP calls made from async views and background email sends
+OUTBOUND_IO_THREADS = config('OUTBOUND_IO_THREADS', default=32, cast=int)
+
 # Admin emails
 ADMINS = [('Admin', config('EMAIL_HOST_USER'))]
 MANAGERS = ADMINS
@@ -172,6 +250,87 @@ SHIPPING_COST = config('SHIPPING_COST', default=5.99, cast=float)
 FREE_SHIPPING_THRESHOLD = config('FREE_SHIPPING_THRESHOLD', default=50.00, cast=float)
 VAT_RATE = config('VAT_RATE', default=0.20, cast=float)
 
+# Processes rendering invoice PDFs (manage.py generate_invoices); stored in STORAGES['invoices']
+INVOICE_WORKERS = config('INVOICE_WORKERS', default=2, cast=int)
+
+# Delivered/cancelled orders older than this move to the archive tables (manage.py archive_orders)
+ORDER_ARCHIVE_AFTER_DAYS = config('ORDER_ARCHIVE_AFTER_DAYS', default=365, cast=int)
+
+# Metrics: /metrics is open to staff, or to scrapers sending "Authorization: Bearer <METRICS_TOKEN>".
+# Set PROMETHEUS_MULTIPROC_DIR in the environment when running several gunicorn workers.
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# L2 of the tiered application cache (leather_shop.cache), shared by every worker: a
+# directory all workers on the host can write, or a database table (run createcachetable)
+# when workers run on several hosts. Production needs one of them: a per-process cache
+# would keep each worker from ever seeing another's invalidations.
+SHARED_CACHE_DIR = config('SHARED_CACHE_DIR', default='')
+SHARED_CACHE_TABLE = config('SHARED_CACHE_TABLE', default='')
+
+if SHARED_CACHE_DIR:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': SHARED_CACHE_DIR,
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    }
+elif SHARED_CACHE_TABLE:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': SHARED_CACHE_TABLE,
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    }
+elif DEBUG:
+    # A per-process stand-in for development
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shared',
+    }
+else:
+    raise ImproperlyConfigured('Set SHARED_CACHE_DIR or SHARED_CACHE_TABLE: workers must share the application cache.')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'leather_shop.metrics.MeteredLocMemCache',
+        'LOCATION': 'default',
+    },
+    # {% cache %} fragments (the base.html chrome, the category menu). Kept per process,
+    # so a deploy never serves markup rendered by the previous release.
+    'template_fragments': {
+        'BACKEND': 'leather_shop.metrics.MeteredLocMemCache',
+        'LOCATION': 'template_fragments',
+    },
+    'shared': SHARED_CACHE,
+}
+
+# L1 of the tiered application cache: entries per process, and how long a process may
+# go on using a tag version after another process invalidated it
+APP_CACHE_L1_ENTRIES = config('APP_CACHE_L1_ENTRIES', default=1000, cast=int)
+APP_CACHE_TAG_TTL = config('APP_CACHE_TAG_TTL', default=5, cast=int)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {'format': '{levelname} {name}: {message}', 'style': '{'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'simple'},
+    },
+    'loggers': {
+        'orders': {'handlers': ['console'], 'level': 'INFO'},
+        'leather_shop': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
+# Query profiler: Server-Timing header plus N+1 warnings for a sample of requests
+QUERY_PROFILER_ENABLED = config('QUERY_PROFILER_ENABLED', default=True, cast=bool)
+QUERY_PROFILER_SAMPLE_RATE = config('QUERY_PROFILER_SAMPLE_RATE', default=1.0 if DEBUG else 0.01, cast=float)
+QUERY_PROFILER_MAX_QUERIES = config('QUERY_PROFILER_MAX_QUERIES', default=30, cast=int)
+QUERY_PROFILER_MAX_DUPLICATES = config('QUERY_PROFILER_MAX_DUPLICATES', default=5, cast=int)
+QUERY_PROFILER_MAX_DB_MS = config('QUERY_PROFILER_MAX_DB_MS', default=200, cast=int)
+# Raise instead of logging, so tests fail on new N+1s
+QUERY_PROFILER_RAISE = config('QUERY_PROFILER_RAISE', default=False, cast=bool)
+
 # Security settings for production
 if not DEBUG:
     SECURE_SSL_REDIRECT = True
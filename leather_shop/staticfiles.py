@@ -0,0 +1,53 @@
+"""
+WhiteNoise for an ASGI middleware chain.
+
+WhiteNoiseMiddleware is sync only, and one sync middleware makes Django
+run everything inside it, async views included, through a thread per
+request. This subclass serves the same files either way; under ASGI the
+file goes out through an async iterator, which Django sends as it is
+read instead of loading it whole first.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .media import CHUNK_SIZE
+
+
+async def aread_file(file):
+    read = sync_to_async(file.read, thread_sensitive=False)
+    try:
+        while True:
+            block = await read(CHUNK_SIZE)
+            if not block:
+                break
+            yield block
+    finally:
+        file.close()
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file, thread_sensitive=False)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is None:
+            return await self.get_response(request)
+        response = self.serve(static_file, request)
+        if response.file_to_stream is not None:
+            response.streaming_content = aread_file(response.file_to_stream)
+        return response
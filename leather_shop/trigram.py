@@ -0,0 +1,45 @@
+"""
+PostgreSQL trigram indexes for icontains searches.
+
+PostgreSQL compiles field__icontains to UPPER("column"::text) LIKE
+UPPER(...), which a GIN index on that expression with gin_trgm_ops can
+serve. Other databases have no pg_trgm and scan instead, so the operation
+does nothing there. It leaves the model state alone: the index is a
+database detail the models don't declare.
+"""
+from django.db.migrations.operations.base import Operation
+
+
+class AddTrigramIndex(Operation):
+    """Create a trigram index on UPPER(column) (and the pg_trgm extension) on PostgreSQL only"""
+    reversible = True
+
+    def __init__(self, name, table, column):
+        self.name = name
+        self.table = table
+        self.column = column
+
+    def deconstruct(self):
+        return self.__class__.__qualname__, [], {'name': self.name, 'table': self.table, 'column': self.column}
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        # Never dropped on the way back: other apps' trigram indexes may need it
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        quote = schema_editor.quote_name
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {quote(self.name)} ON {quote(self.table)} '
+            f'USING gin (UPPER({quote(self.column)}::text) gin_trgm_ops)'
+        )
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(self.name)}')
+
+    def describe(self):
+        return f'Create trigram index {self.name} on {self.table}.{self.column} (PostgreSQL only)'
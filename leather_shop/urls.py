@@ -3,6 +3,8 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from products import views as product_views
+from .media import serve_media
+from .metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -11,8 +13,10 @@ urlpatterns = [
     path('cart/', include('cart.urls')),
     path('orders/', include('orders.urls')),
     path('users/', include('users.urls')),
+    path('metrics', metrics_view, name='metrics'),
+    # Product images, in production too (see leather_shop.media)
+    path(f'{settings.MEDIA_URL.lstrip("/")}<path:path>', serve_media, name='media'),
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
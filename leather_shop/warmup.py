@@ -0,0 +1,132 @@
+"""
+Start-up warm-up, so a fresh worker serves its first requests as fast as
+its thousandth.
+
+gunicorn.conf.py preloads the app in the master and calls warm_master()
+before forking: the lazy imports, URL resolver and compiled templates are
+then shared by every worker. warm_worker() runs in each new worker (after
+every deploy and max_requests recycle): it fills the worker's database
+connection pools, then sends a few internal catalogue requests through the
+full middleware stack, which fills the per-process caches. Each phase is timed and
+logged.
+"""
+import importlib
+import logging
+import time
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.db import connections
+from django.template.loader import get_template
+from django.urls import get_resolver, reverse
+
+logger = logging.getLogger(__name__)
+
+# Set in request.META on warm-up requests (never present on real traffic), so metrics skip them
+WARMUP_MARKER = 'leather_shop.warmup'
+
+# Modules the views import lazily or on first use
+WARM_IMPORTS = [
+    'orders.stripe_client',
+    'PIL.Image',
+]
+
+WARM_TEMPLATES = [
+    'base.html',
+    'home.html',
+    'products/product_list.html',
+    'products/product_detail.html',
+    'cart/cart_detail.html',
+    'orders/order_create.html',
+    'orders/payment.html',
+    'orders/order_detail.html',
+    'orders/order_list.html',
+    'users/login.html',
+]
+
+
+def timed_phases(phases):
+    """Run (name, func) pairs; returns [(name, seconds)]"""
+    timings = []
+    for name, func in phases:
+        started = time.perf_counter()
+        func()
+        timings.append((name, time.perf_counter() - started))
+    return timings
+
+
+def log_timings(label, timings):
+    total = sum(seconds for _, seconds in timings)
+    phases = ', '.join(f'{name} {seconds * 1000:.0f}ms' for name, seconds in timings)
+    logger.info('%s warm-up took %.0fms: %s', label, total * 1000, phases)
+
+
+def warm_imports():
+    for module in WARM_IMPORTS:
+        importlib.import_module(module)
+
+
+def warm_urls():
+    # Compiles every pattern; reverse() builds the reverse lookup tables
+    get_resolver().resolve('/')
+    reverse('home')
+
+
+def warm_templates():
+    for name in WARM_TEMPLATES:
+        get_template(name)
+
+
+def warm_static():
+    # Building the storage reads the static manifest, if there is one
+    staticfiles_storage.location
+
+
+def warm_master():
+    """Work shared by all workers; run once in the master before forking"""
+    timings = timed_phases([
+        ('imports', warm_imports),
+        ('urls', warm_urls),
+        ('templates', warm_templates),
+        ('static', warm_static),
+    ])
+    # Never hand a database connection across fork()
+    connections.close_all()
+    return timings
+
+
+def warm_database():
+    # Requests run their queries in threads of their own, so a connection opened
+    # here would only sit idle; open the pools they draw from instead
+    for alias in connections:
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is not None:
+            pool.open(wait=True)
+
+
+def warm_requests():
+    """GET the catalogue pages through the full stack, as an anonymous visitor"""
+    # Imported here: leather_shop.metrics imports this module on every start-up
+    from django.test import Client
+    from products.models import Product
+
+    host = next((host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'), 'localhost')
+    client = Client(raise_request_exception=False, HTTP_HOST=host, **{WARMUP_MARKER: True})
+    urls = [reverse('home'), reverse('products:product_list')]
+    product = Product.objects.filter(available=True).only('slug').first()
+    if product:
+        urls.append(product.get_absolute_url())
+    for url in urls:
+        response = client.get(url, secure=not settings.DEBUG)
+        if response.status_code != 200:
+            logger.warning('Warm-up request to %s returned HTTP %s', url, response.status_code)
+    # The product lookup ran on this thread, which serves no requests; return its connection
+    connections.close_all()
+
+
+def warm_worker():
+    """Per-process state: the database pools and the caches filled by real requests"""
+    return timed_phases([
+        ('database', warm_database),
+        ('requests', warm_requests),
+    ])
@@ -1,5 +1,53 @@
-from django.contrib import admin
-from .models import Order, OrderItem
+from django import forms
+from django.contrib import admin, messages
+from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from leather_shop.pagination import EstimatedCountPaginator
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem, StripeEvent
+from .exports import EXPORT_CONTENT_TYPES, astream_export, stream_export
+from .search import search_orders
+from .services import bulk_transition, update_order
+
+
+def export_orders_response(request, queryset, export_format):
+    """Stream the selected orders and their lines as a download"""
+    stream = astream_export if isinstance(request, ASGIRequest) else stream_export
+    response = StreamingHttpResponse(
+        stream(queryset, export_format),
+        content_type=EXPORT_CONTENT_TYPES[export_format],
+    )
+    filename = f'orders-{timezone.localdate():%Y-%m-%d}.{export_format}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@admin.action(description='Export selected orders (CSV)')
+def export_orders_csv(modeladmin, request, queryset):
+    return export_orders_response(request, queryset, 'csv')
+
+
+@admin.action(description='Export selected orders (JSON Lines)')
+def export_orders_jsonl(modeladmin, request, queryset):
+    return export_orders_response(request, queryset, 'jsonl')
+
+
+def make_status_action(status, label):
+    """Build an admin action that moves the selected orders to `status`"""
+    def action(modeladmin, request, queryset):
+        results = bulk_transition(list(queryset.values_list('id', flat=True)), status)
+        updated = sum(1 for result in results if result['success'])
+        if updated:
+            modeladmin.message_user(request, f'{updated} order(s) marked as {label}.', messages.SUCCESS)
+        for result in results:
+            if not result['success']:
+                modeladmin.message_user(request, f'Order #{result["order_id"]}: {result["message"]}', messages.ERROR)
+            elif result['email_sent'] is False:
+                modeladmin.message_user(request, f'Order #{result["order_id"]}: {result["message"]}', messages.WARNING)
+    
+    action.__name__ = f'mark_{status}'
+    return admin.action(description=f'Mark selected orders as {label}')(action)
 
 
 class OrderItemInline(admin.TabularInline):
@@ -9,12 +57,49 @@ class OrderItemInline(admin.TabularInline):
     readonly_fields = ['get_total_price']
     
     def get_total_price(self, obj):
+        # The blank "add another" row has no price yet
+        if obj.price is None:
+            return '-'
         return f'£{obj.get_total_price()}'
     get_total_price.short_description = 'Total'
 
 
+class OrderSearchMixin:
+    """Indexed staff search and estimated counts for the order changelists"""
+    search_fields = ['id', 'stripe_payment_intent', 'email', 'postcode', 'full_name']
+    search_help_text = 'Order number, payment intent (pi_...), email, postcode or customer name'
+    paginator = EstimatedCountPaginator
+    # Skip the second, unfiltered COUNT(*) Django runs alongside every search
+    show_full_result_count = False
+    
+    def get_search_results(self, request, queryset, search_term):
+        return search_orders(search_term, queryset), False
+
+
+class OrderAdminForm(forms.ModelForm):
+    """The order change form, carrying the version the editor opened"""
+    version = forms.IntegerField(widget=forms.HiddenInput, required=False)
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.instance.pk is not None:
+            # Lock the row for the rest of the admin's transaction, so nothing can
+            # change it between this check and save_model()
+            current = Order.objects.select_for_update().filter(pk=self.instance.pk).values_list(
+                'version', flat=True
+            ).first()
+            if cleaned_data.get('version') != current:
+                raise ValidationError(
+                    'This order was changed by someone else after you opened it. '
+                    'Reload the page to see their changes, then make yours again.',
+                    code='conflict',
+                )
+        return cleaned_data
+
+
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(OrderSearchMixin, admin.ModelAdmin):
+    form = OrderAdminForm
     list_display = [
         'id',
         'user',
@@ -27,7 +112,6 @@ class OrderAdmin(admin.ModelAdmin):
         'created_at'
     ]
     list_filter = ['status', 'paid', 'created_at', 'shipping_method']
-    search_fields = ['id', 'full_name', 'email', 'phone', 'postcode']
     readonly_fields = [
         'created_at',
         'updated_at',
@@ -35,7 +119,8 @@ class OrderAdmin(admin.ModelAdmin):
         'shipping_cost',
         'vat',
         'total_amount',
-        'stripe_payment_intent'
+        'stripe_payment_intent',
+        'invoice_hash'
     ]
     
     fieldsets = (
@@ -45,7 +130,8 @@ class OrderAdmin(admin.ModelAdmin):
                 'status',
                 'paid',
                 'created_at',
-                'updated_at'
+                'updated_at',
+                'version',
             )
         }),
         ('Shipping Information', {
@@ -73,11 +159,30 @@ class OrderAdmin(admin.ModelAdmin):
         ('Payment', {
             'fields': (
                 'stripe_payment_intent',
+                'invoice_hash',
             )
         }),
     )
     
     inlines = [OrderItemInline]
+    actions = [
+        make_status_action('processing', 'Processing'),
+        make_status_action('shipped', 'Shipped'),
+        make_status_action('delivered', 'Delivered'),
+        make_status_action('cancelled', 'Cancelled'),
+        export_orders_csv,
+        export_orders_jsonl,
+    ]
+    
+    def save_model(self, request, obj, form, change):
+        if not change:
+            return super().save_model(request, obj, form, change)
+        
+        # Write only the edited columns, and bump the version so other writers notice.
+        # obj.version is the one the editor opened, checked in OrderAdminForm.clean()
+        changes = {field: getattr(obj, field) for field in form.changed_data if field != 'version'}
+        if changes:
+            update_order(obj, **changes)
     
     def get_readonly_fields(self, request, obj=None):
         # If editing an existing order, make most fields read-only
@@ -106,4 +211,48 @@ class OrderItemAdmin(admin.ModelAdmin):
     
     def get_total(self, obj):
         return f'£{obj.get_total_price()}'
-    get_total.short_description = 'Total Price'
\ No newline at end of file
+    get_total.short_description = 'Total Price'
+
+
+class ArchivedOrderItemInline(admin.TabularInline):
+    model = ArchivedOrderItem
+    raw_id_fields = ['product']
+    extra = 0
+    can_delete = False
+    readonly_fields = ['product', 'size', 'price', 'quantity']
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(OrderSearchMixin, admin.ModelAdmin):
+    """Read-only view of orders moved out of the live table"""
+    list_display = ['id', 'user', 'full_name', 'email', 'status', 'total_amount', 'created_at', 'archived_at']
+    list_filter = ['status', 'archived_at']
+    raw_id_fields = ['user']
+    inlines = [ArchivedOrderItemInline]
+    actions = [export_orders_csv, export_orders_jsonl]
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(StripeEvent)
+class StripeEventAdmin(admin.ModelAdmin):
+    list_display = ['event_id', 'event_type', 'received_at', 'processed_at', 'attempts']
+    list_filter = ['event_type', 'processed_at']
+    search_fields = ['event_id']
+    readonly_fields = [
+        'event_id',
+        'event_type',
+        'payload',
+        'stripe_created',
+        'received_at',
+        'processed_at',
+        'attempts',
+        'last_error'
+    ]
\ No newline at end of file
@@ -0,0 +1,65 @@
+from datetime import timedelta
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+
+
+# Only orders that can no longer change are archived
+ARCHIVABLE_STATUSES = ['delivered', 'cancelled']
+
+
+def copy_fields(source, model, **extra):
+    """Build an unsaved `model` instance with every column copied from `source`"""
+    values = {
+        field.attname: getattr(source, field.attname)
+        for field in source._meta.concrete_fields
+    }
+    values.update(extra)
+    return model(**values)
+
+
+def archive_batch(cutoff, batch_size):
+    """
+    Move one batch of old delivered/cancelled orders (and their lines) into
+    the archive tables. Each batch commits on its own, so an interrupted run
+    can simply be started again. Returns the number of orders archived.
+    """
+    candidates = Order.objects.filter(
+        status__in=ARCHIVABLE_STATUSES,
+        created_at__lt=cutoff,
+    ).order_by('id')
+    
+    # Skip rows another process is writing rather than waiting on them
+    if connection.features.has_select_for_update_skip_locked:
+        candidates = candidates.select_for_update(skip_locked=True, of=('self',))
+    
+    with transaction.atomic():
+        orders = list(candidates[:batch_size])
+        if not orders:
+            return 0
+        ids = [order.id for order in orders]
+        
+        ArchivedOrder.objects.bulk_create([copy_fields(order, ArchivedOrder) for order in orders])
+        ArchivedOrderItem.objects.bulk_create([
+            copy_fields(item, ArchivedOrderItem)
+            for item in OrderItem.objects.filter(order_id__in=ids).order_by('id')
+        ])
+        
+        OrderItem.objects.filter(order_id__in=ids).delete()
+        Order.objects.filter(id__in=ids).delete()
+    
+    return len(orders)
+
+
+def archive_orders(older_than=timedelta(days=365), batch_size=500, max_batches=None):
+    """Archive batches until nothing is left (or `max_batches` is reached)"""
+    cutoff = timezone.now() - older_than
+    total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        archived = archive_batch(cutoff, batch_size)
+        if not archived:
+            break
+        total += archived
+        batches += 1
+    return total
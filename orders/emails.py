@@ -1,9 +1,14 @@
+import logging
 from django.core.mail import send_mail
+from django.db.models import prefetch_related_objects
 from django.template.loader import render_to_string
 from django.conf import settings
+from leather_shop.outbound import submit_outbound
 
+logger = logging.getLogger(__name__)
 
-def send_order_created_email(order):
+
+def send_order_created_email(order, connection=None):
     """
     Send email to customer when order is created (pending status)
     """
@@ -69,14 +74,15 @@ UK Leather Jackets Team
             from_email=settings.DEFAULT_FROM_EMAIL,
             recipient_list=[order.email],
             fail_silently=False,
+            connection=connection,
         )
         return True
-    except Exception as e:
-        print(f"Error sending order created email: {e}")
+    except Exception:
+        logger.exception('Error sending order created email for order #%s', order.id)
         return False
 
 
-def send_order_confirmed_email(order):
+def send_order_confirmed_email(order, connection=None):
     """
     Send email to customer when admin changes status from pending to processing
     """
@@ -136,14 +142,15 @@ Phone: +44 20 1234 5678
             from_email=settings.DEFAULT_FROM_EMAIL,
             recipient_list=[order.email],
             fail_silently=False,
+            connection=connection,
         )
         return True
-    except Exception as e:
-        print(f"Error sending order confirmed email: {e}")
+    except Exception:
+        logger.exception('Error sending order confirmed email for order #%s', order.id)
         return False
 
 
-def send_order_shipped_email(order):
+def send_order_shipped_email(order, connection=None):
     """
     Send email to customer when order is shipped
     """
@@ -204,14 +211,15 @@ Phone: +44 20 1234 5678
             from_email=settings.DEFAULT_FROM_EMAIL,
             recipient_list=[order.email],
             fail_silently=False,
+            connection=connection,
         )
         return True
-    except Exception as e:
-        print(f"Error sending order shipped email: {e}")
+    except Exception:
+        logger.exception('Error sending order shipped email for order #%s', order.id)
         return False
 
 
-def send_order_delivered_email(order):
+def send_order_delivered_email(order, connection=None):
     """
     Send email to customer when order is delivered
     """
@@ -270,14 +278,15 @@ Phone: +44 20 1234 5678
             from_email=settings.DEFAULT_FROM_EMAIL,
             recipient_list=[order.email],
             fail_silently=False,
+            connection=connection,
         )
         return True
-    except Exception as e:
-        print(f"Error sending order delivered email: {e}")
+    except Exception:
+        logger.exception('Error sending order delivered email for order #%s', order.id)
         return False
 
 
-def send_order_cancelled_email(order):
+def send_order_cancelled_email(order, connection=None):
     """
     Send email to customer when order is cancelled
     """
@@ -323,8 +332,35 @@ Phone: +44 20 1234 5678
             from_email=settings.DEFAULT_FROM_EMAIL,
             recipient_list=[order.email],
             fail_silently=False,
+            connection=connection,
         )
         return True
-    except Exception as e:
-        print(f"Error sending order cancelled email: {e}")
-        return False
\ No newline at end of file
+    except Exception:
+        logger.exception('Error sending order cancelled email for order #%s', order.id)
+        return False
+
+
+def send_status_change_email(order, old_status, new_status, connection=None):
+    """
+    Send the email that goes with a status change, if there is one.
+    Returns None when the change has no email, otherwise whether it was sent.
+    """
+    if old_status == 'pending' and new_status == 'processing':
+        return send_order_confirmed_email(order, connection=connection)
+    elif new_status == 'shipped':
+        return send_order_shipped_email(order, connection=connection)
+    elif new_status == 'delivered':
+        return send_order_delivered_email(order, connection=connection)
+    elif new_status == 'cancelled':
+        return send_order_cancelled_email(order, connection=connection)
+    return None
+
+
+def send_in_background(send, order, *args):
+    """
+    Queue one of the send_* functions above without waiting for SMTP.
+    The order's items are loaded here first, as the sending thread has no
+    database access.
+    """
+    prefetch_related_objects([order], 'items__product')
+    return submit_outbound(send, order, *args)
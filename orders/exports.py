@@ -0,0 +1,153 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+from itertools import chain
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import QuerySet
+from django.utils import timezone
+from .models import Order
+
+
+# (header, Order lookup) for every exported column; one row per order line
+EXPORT_COLUMNS = [
+    ('order_id', 'id'),
+    ('created_at', 'created_at'),
+    ('status', 'status'),
+    ('paid', 'paid'),
+    ('payment_method', 'payment_method'),
+    ('shipping_method', 'shipping_method'),
+    ('full_name', 'full_name'),
+    ('email', 'email'),
+    ('postcode', 'postcode'),
+    ('subtotal', 'subtotal'),
+    ('shipping_cost', 'shipping_cost'),
+    ('vat', 'vat'),
+    ('total_amount', 'total_amount'),
+    ('amount_paid_online', 'amount_paid_online'),
+    ('remaining_amount', 'remaining_amount'),
+    ('stripe_payment_intent', 'stripe_payment_intent'),
+    ('item_id', 'items__id'),
+    ('product_id', 'items__product_id'),
+    ('product_name', 'items__product__name'),
+    ('size', 'items__size'),
+    ('quantity', 'items__quantity'),
+    ('unit_price', 'items__price'),
+]
+
+EXPORT_HEADERS = [header for header, _ in EXPORT_COLUMNS]
+
+# Characters per block handed to the server under ASGI
+BLOCK_SIZE = 64 * 1024
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+def filter_orders(orders=None, start=None, end=None, status=None):
+    """Apply the export's date (inclusive) and status filters"""
+    orders = Order.objects.all() if orders is None else orders
+    # Compare created_at against local midnights so its index can be used
+    if start:
+        orders = orders.filter(created_at__gte=timezone.make_aware(datetime.combine(start, time.min)))
+    if end:
+        orders = orders.filter(created_at__lt=timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)))
+    if status:
+        orders = orders.filter(status=status)
+    return orders
+
+
+def export_rows(orders, batch_size=1000, chunk_size=2000):
+    """
+    Yield one tuple per order line (orders without lines get one empty line).
+    Orders are walked in id batches so each query is short and no
+    transaction or cursor stays open for the whole export.
+    """
+    orders = orders.order_by()
+    lookups = [lookup for _, lookup in EXPORT_COLUMNS]
+    last_id = 0
+    
+    while True:
+        ids = list(
+            orders.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return
+        
+        # Order lines through a single ordered LEFT JOIN
+        yield from orders.model.objects.filter(id__in=ids).order_by('id', 'items__id').values_list(
+            *lookups
+        ).iterator(chunk_size=chunk_size)
+        last_id = ids[-1]
+
+
+class Echo:
+    """A file-like object that hands back whatever is written to it"""
+    def write(self, value):
+        return value
+
+
+def format_value(value):
+    if hasattr(value, 'tzinfo'):
+        return timezone.localtime(value).isoformat()
+    return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_HEADERS)
+    for row in rows:
+        yield writer.writerow([format_value(value) for value in row])
+
+
+def stream_jsonl(rows):
+    for row in rows:
+        record = dict(zip(EXPORT_HEADERS, (format_value(value) for value in row)))
+        yield json.dumps(record, cls=DjangoJSONEncoder) + '\n'
+
+
+def stream_export(orders, export_format='csv', **kwargs):
+    """
+    Encode the export rows lazily as CSV or JSON Lines.
+    `orders` is an Order or ArchivedOrder queryset, or a list of them.
+    """
+    if isinstance(orders, QuerySet):
+        orders = [orders]
+    rows = chain.from_iterable(export_rows(queryset, **kwargs) for queryset in orders)
+    if export_format == 'jsonl':
+        return stream_jsonl(rows)
+    return stream_csv(rows)
+
+
+def join_chunks(chunks, size=BLOCK_SIZE):
+    """Join the short strings from `chunks` into blocks of about `size` characters"""
+    buffer, length = [], 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+async def astream_export(orders, export_format='csv', **kwargs):
+    """
+    stream_export() as an async iterator, for ASGI: Django would read a sync
+    iterator to the end before sending it. Blocks are built in the ORM's
+    thread, so memory stays bounded by one block and one query batch.
+    """
+    blocks = join_chunks(stream_export(orders, export_format, **kwargs))
+    read = sync_to_async(next)
+    try:
+        while True:
+            block = await read(blocks, None)
+            if block is None:
+                return
+            yield block
+    finally:
+        # Closes the open cursor, if the client went away mid-export
+        await sync_to_async(blocks.close)()
@@ -0,0 +1,149 @@
+"""
+Invoice PDF rendering.
+
+Kept free of Django imports so it can run in a worker process pool: the
+worker gets a plain dict from orders.invoices and returns the PDF bytes,
+which the parent process saves to the invoice storage.
+"""
+
+PAGE_WIDTH = 595  # A4, in points
+PAGE_HEIGHT = 842
+MARGIN = 50
+
+FONTS = {
+    'regular': 'Helvetica',
+    'bold': 'Helvetica-Bold',
+    'mono': 'Courier',
+}
+
+# Courier glyphs are 0.6em wide, which lets amounts line up on the right
+MONO_WIDTH = 0.6
+
+
+def escape(text):
+    text = str(text).encode('latin-1', 'replace').decode('latin-1')
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+class Canvas:
+    """Lays out lines of text top to bottom, starting new pages as needed"""
+
+    def __init__(self):
+        self.pages = []
+        self.new_page()
+
+    def new_page(self):
+        self.ops = []
+        self.pages.append(self.ops)
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def text(self, x, text, font='regular', size=10):
+        self.ops.append(f'BT /{font} {size} Tf {x:.1f} {self.y:.1f} Td ({escape(text)}) Tj ET')
+
+    def right(self, text, font='mono', size=10):
+        width = len(str(text)) * size * MONO_WIDTH
+        self.text(PAGE_WIDTH - MARGIN - width, text, font, size)
+
+    def line(self):
+        self.ops.append(f'{MARGIN} {self.y:.1f} m {PAGE_WIDTH - MARGIN} {self.y:.1f} l S')
+
+    def down(self, points):
+        self.y -= points
+        if self.y < MARGIN:
+            self.new_page()
+
+    def to_pdf(self):
+        """Serialise the pages as a PDF document"""
+        fonts = list(FONTS.items())
+        first_font = 3
+        first_page = first_font + len(fonts)
+
+        objects = [
+            '<< /Type /Catalog /Pages 2 0 R >>',
+            '<< /Type /Pages /Kids [{}] /Count {} >>'.format(
+                ' '.join(f'{first_page + 2 * i} 0 R' for i in range(len(self.pages))),
+                len(self.pages),
+            ),
+        ]
+        for _, base_font in fonts:
+            objects.append(f'<< /Type /Font /Subtype /Type1 /BaseFont /{base_font} /Encoding /WinAnsiEncoding >>')
+
+        font_resources = ' '.join(f'/{name} {first_font + i} 0 R' for i, (name, _) in enumerate(fonts))
+        for i, ops in enumerate(self.pages):
+            stream = '\n'.join(ops)
+            objects.append(
+                f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] '
+                f'/Resources << /Font << {font_resources} >> >> /Contents {first_page + 2 * i + 1} 0 R >>'
+            )
+            objects.append(f'<< /Length {len(stream.encode("latin-1"))} >>\nstream\n{stream}\nendstream')
+
+        out = bytearray(b'%PDF-1.4\n')
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(len(out))
+            out += f'{number} 0 obj\n{body}\nendobj\n'.encode('latin-1')
+
+        xref = len(out)
+        out += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode('latin-1')
+        for offset in offsets:
+            out += f'{offset:010d} 00000 n \n'.encode('latin-1')
+        out += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode('latin-1')
+        return bytes(out)
+
+
+def render_invoice(data):
+    """Render the invoice described by orders.invoices.invoice_data() to PDF bytes"""
+    canvas = Canvas()
+    canvas.text(MARGIN, data['seller'], 'bold', 16)
+    canvas.right(f'INVOICE #{data["order_id"]}', 'mono', 14)
+    canvas.down(18)
+    canvas.text(MARGIN, f'Order date: {data["created_at"]}')
+    canvas.right(data['payment_status'], 'mono', 9)
+    canvas.down(30)
+
+    canvas.text(MARGIN, 'Bill to', 'bold', 11)
+    canvas.down(15)
+    for line in data['address']:
+        canvas.text(MARGIN, line)
+        canvas.down(13)
+    canvas.text(MARGIN, f'Shipping: {data["shipping_method"]}')
+    canvas.down(25)
+
+    canvas.text(MARGIN, 'Item', 'bold')
+    canvas.text(330, 'Size', 'bold')
+    canvas.text(380, 'Qty', 'bold')
+    canvas.right('Amount', 'bold')
+    canvas.down(6)
+    canvas.line()
+    canvas.down(14)
+    for item in data['items']:
+        canvas.text(MARGIN, item['name'][:50])
+        canvas.text(330, item['size'])
+        canvas.text(380, f'{item["quantity"]} x £{item["price"]}')
+        canvas.right(f'£{item["total"]}')
+        canvas.down(14)
+    canvas.line()
+    canvas.down(16)
+
+    for label, amount, font in [
+        ('Subtotal', data['subtotal'], 'regular'),
+        ('Shipping', data['shipping_cost'], 'regular'),
+        ('Net', data['net'], 'regular'),
+        (f'VAT @ {data["vat_rate"]}', data['vat'], 'regular'),
+        ('Total', data['total_amount'], 'bold'),
+    ]:
+        canvas.text(330, label, font)
+        canvas.right(f'£{amount}')
+        canvas.down(14)
+
+    if data['payment_method'] == 'partial':
+        canvas.down(10)
+        canvas.text(330, 'Paid online')
+        canvas.right(f'£{data["amount_paid_online"]}')
+        canvas.down(14)
+        canvas.text(330, 'Due on delivery', 'bold')
+        canvas.right(f'£{data["remaining_amount"]}')
+        canvas.down(14)
+
+    return canvas.to_pdf()
+
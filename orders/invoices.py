@@ -0,0 +1,137 @@
+import hashlib
+import json
+import logging
+from decimal import Decimal
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.db.models import Prefetch, Q
+from .invoice_pdf import render_invoice
+from .models import Order, OrderItem
+
+logger = logging.getLogger(__name__)
+
+
+# Order fields printed on the invoice; changing any of them queues a new one
+INVOICE_FIELDS = {
+    'full_name', 'email', 'phone',
+    'address_line_1', 'address_line_2', 'city', 'county', 'postcode',
+    'shipping_method', 'payment_method', 'paid', 'partial_payment_received',
+    'subtotal', 'shipping_cost', 'vat', 'total_amount',
+    'amount_paid_online', 'remaining_amount',
+}
+
+# Bump after changing the layout in orders.invoice_pdf to re-render every invoice
+INVOICE_LAYOUT_VERSION = 1
+
+SELLER_NAME = 'UK Leather Jackets'
+
+
+def pending_invoices():
+    """Paid orders whose invoice is missing or out of date"""
+    # Mirrors the partial index condition on Order so the queue lookup stays cheap
+    return Order.objects.filter(
+        Q(paid=True) | Q(partial_payment_received=True), invoice_hash=''
+    )
+
+
+def invoice_data(order):
+    """Everything printed on the invoice, as plain picklable values"""
+    items = [
+        {
+            'name': item.product.name,
+            'size': item.size,
+            'quantity': item.quantity,
+            'price': str(item.price),
+            'total': str(item.get_total_price()),
+        }
+        for item in order.items.all()
+    ]
+    address = [
+        order.full_name,
+        order.address_line_1,
+        order.address_line_2,
+        order.city,
+        order.county,
+        order.postcode,
+        order.email,
+        order.phone,
+    ]
+    return {
+        'layout': INVOICE_LAYOUT_VERSION,
+        'seller': SELLER_NAME,
+        'order_id': order.id,
+        'created_at': order.created_at.strftime('%d %B %Y'),
+        'address': [line for line in address if line],
+        'shipping_method': order.get_shipping_method_display(),
+        'payment_method': order.payment_method,
+        'payment_status': order.get_payment_status_display_custom(),
+        'items': items,
+        'subtotal': str(order.subtotal),
+        'shipping_cost': str(order.shipping_cost),
+        'net': str(order.subtotal + order.shipping_cost),
+        'vat_rate': f'{(Decimal(str(settings.VAT_RATE)) * 100).normalize():f}%',
+        'vat': str(order.vat),
+        'total_amount': str(order.total_amount),
+        'amount_paid_online': str(order.amount_paid_online),
+        'remaining_amount': str(order.remaining_amount),
+    }
+
+
+def invoice_digest(data):
+    """Content address of an invoice: identical data always maps to the same file"""
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def invoice_storage():
+    """Where invoices are kept: STORAGES['invoices'], shared by the web and invoice processes"""
+    return storages['invoices']
+
+
+def invoice_name(digest):
+    return f'{digest[:2]}/{digest}.pdf'
+
+
+def generate_invoices(executor, batch_size=100):
+    """
+    Sweep the invoice queue once, rendering missing PDFs on `executor`
+    (a process pool). Orders whose data hashes to an existing file are
+    stamped without re-rendering. Returns the number of orders stamped.
+    """
+    items = Prefetch('items', queryset=OrderItem.objects.select_related('product').only(
+        'order_id', 'size', 'price', 'quantity', 'product__name'
+    ).order_by('id'))
+    storage = invoice_storage()
+    stamped = 0
+    last_id = 0
+    while True:
+        orders = list(
+            pending_invoices().filter(id__gt=last_id).order_by('id').prefetch_related(items)[:batch_size]
+        )
+        if not orders:
+            return stamped
+        last_id = orders[-1].id
+
+        jobs = []
+        for order in orders:
+            data = invoice_data(order)
+            digest = invoice_digest(data)
+            future = None
+            if not storage.exists(invoice_name(digest)):
+                future = executor.submit(render_invoice, data)
+            jobs.append((order, digest, future))
+
+        for order, digest, future in jobs:
+            if future is not None:
+                try:
+                    pdf = future.result()
+                    # Two orders with identical data share a file; write it once
+                    if not storage.exists(invoice_name(digest)):
+                        storage.save(invoice_name(digest), ContentFile(pdf))
+                except Exception:
+                    logger.exception('Invoice error for order #%s', order.id)
+                    continue
+            # Skip orders edited meanwhile; the edit queued them again
+            stamped += Order.objects.filter(id=order.id, version=order.version, invoice_hash='').update(
+                invoice_hash=digest
+            )
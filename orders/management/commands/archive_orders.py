@@ -0,0 +1,28 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from orders.archive import archive_orders
+
+
+class Command(BaseCommand):
+    help = 'Move old delivered and cancelled orders into the archive tables, in resumable batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ORDER_ARCHIVE_AFTER_DAYS,
+                            help='Archive orders placed more than this many days ago')
+        parser.add_argument('--batch-size', type=int, default=500, help='Orders moved per transaction')
+        parser.add_argument('--max-batches', type=int, help='Stop after this many batches')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        archived = archive_orders(
+            older_than=timedelta(days=options['days']),
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {archived} orders in {time.perf_counter() - started:.2f}s.'
+        ))
@@ -0,0 +1,356 @@
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.stripe_stub import make_server
+from products.models import Category, Product
+
+from .seed_benchmark import BENCH_PASSWORD, SIZES
+
+
+DEFAULT_MIX = 'browse=45,search=15,filter=15,cart=15,checkout=10'
+SEARCH_TERMS = ['biker', 'bomber', 'black', 'brown jacket', 'vintage', 'suede', 'slim fit', 'shearling']
+
+# Set by QueryProfilerMiddleware on every profiled response
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, round(p / 100 * len(values) + 0.5) - 1))]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Recorder:
+    """Thread-safe per-endpoint samples of (seconds, status, queries)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+
+    def add(self, endpoint, seconds, status, queries):
+        with self.lock:
+            self.samples[endpoint].append((seconds, status, queries))
+
+    def summary(self, duration):
+        endpoints = {}
+        for endpoint, samples in sorted(self.samples.items()):
+            timings = sorted(seconds for seconds, _, _ in samples)
+            queries = [q for _, _, q in samples if q is not None]
+            endpoints[endpoint] = {
+                'requests': len(samples),
+                'errors': sum(1 for _, status, _ in samples if status is None or status >= 400),
+                'p50_ms': round(percentile(timings, 50) * 1000, 1),
+                'p95_ms': round(percentile(timings, 95) * 1000, 1),
+                'p99_ms': round(percentile(timings, 99) * 1000, 1),
+                'rps': round(len(samples) / duration, 1),
+                'queries': round(sum(queries) / len(queries), 1) if queries else None,
+            }
+        return endpoints
+
+
+class Client:
+    """One simulated shopper with its own cookie jar"""
+
+    def __init__(self, base_url, recorder, rng, catalogue, username=None):
+        self.base_url = base_url.rstrip('/')
+        self.recorder = recorder
+        self.rng = rng
+        self.catalogue = catalogue
+        self.username = username
+        self.logged_in = False
+        self.session = requests.Session()
+
+    def request(self, endpoint, method, path, **kwargs):
+        kwargs.setdefault('allow_redirects', False)
+        headers = kwargs.setdefault('headers', {})
+        if method == 'POST':
+            headers['X-CSRFToken'] = self.session.cookies.get('csrftoken', '')
+            headers['Referer'] = self.base_url + path
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=30, **kwargs)
+        except requests.RequestException:
+            self.recorder.add(endpoint, time.perf_counter() - started, None, None)
+            return None
+        elapsed = time.perf_counter() - started
+        match = SERVER_TIMING_QUERIES.search(response.headers.get('Server-Timing', ''))
+        self.recorder.add(endpoint, elapsed, response.status_code, int(match.group(1)) if match else None)
+        return response
+
+    def post(self, endpoint, path, data=None):
+        data = dict(data or {}, csrfmiddlewaretoken=self.session.cookies.get('csrftoken', ''))
+        return self.request(endpoint, 'POST', path, data=data)
+
+    def browse(self):
+        self.request('home', 'GET', '/')
+        self.request('product_list', 'GET', '/products/', params={'page': self.rng.randint(1, 5)})
+        for _ in range(self.rng.randint(1, 3)):
+            self.request('product_detail', 'GET', f'/products/{self.rng.choice(self.catalogue["slugs"])}/')
+
+    def search(self):
+        self.request('search', 'GET', '/products/', params={'q': self.rng.choice(SEARCH_TERMS)})
+        self.request('product_detail', 'GET', f'/products/{self.rng.choice(self.catalogue["slugs"])}/')
+
+    def filter(self):
+        self.request('filter', 'GET', '/products/', params={
+            'category': self.rng.choice(self.catalogue['categories']),
+            'gender': self.rng.choice(['M', 'W', '']),
+            'min_price': self.rng.choice(['', '100']),
+            'max_price': self.rng.choice(['', '300']),
+            'sort': self.rng.choice(['newest', 'price_low', 'price_high', 'name']),
+        })
+
+    def cart(self):
+        self.add_to_cart()
+        self.request('cart_detail', 'GET', '/cart/')
+
+    def add_to_cart(self):
+        if 'csrftoken' not in self.session.cookies:
+            self.request('product_detail', 'GET', f'/products/{self.rng.choice(self.catalogue["slugs"])}/')
+        product_id = self.rng.choice(self.catalogue['ids'])
+        self.post('cart_add', f'/cart/add/{product_id}/', {
+            'size': self.rng.choice(SIZES), 'quantity': self.rng.randint(1, 2),
+        })
+
+    def checkout(self):
+        if not self.login():
+            return self.cart()
+        self.add_to_cart()
+        self.request('order_create', 'GET', '/orders/create/')
+        response = self.post('order_create_submit', '/orders/create/', {
+            'full_name': 'Bench Customer',
+            'email': f'{self.username}@example.com',
+            'phone': '+44 20 1234 5678',
+            'address_line_1': '1 High Street',
+            'city': 'London',
+            'postcode': 'SW1A 1AA',
+            'shipping_method': self.rng.choice(['standard', 'express']),
+            'payment_method': self.rng.choice(['full', 'partial']),
+        })
+        if response is None or response.status_code != 302:
+            return
+        payment_path = response.headers['Location']
+        self.request('payment', 'GET', payment_path)
+        self.post('payment_intent', payment_path)
+
+    def login(self):
+        if self.logged_in or self.username is None:
+            return self.logged_in
+        self.request('login_form', 'GET', '/users/login/')
+        response = self.post('login', '/users/login/', {'username': self.username, 'password': BENCH_PASSWORD})
+        self.logged_in = response is not None and response.status_code == 302
+        return self.logged_in
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive browse, search, filter, cart and checkout scenarios against a running shop '
+        'with concurrent clients and report latency percentiles, throughput and queries '
+        'per request for each endpoint. Seed data first with `manage.py seed_benchmark`.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', help='Shop to benchmark, e.g. http://127.0.0.1:8000')
+        parser.add_argument(
+            '--serve', action='store_true',
+            help='Start gunicorn and a Stripe stub on free local ports instead of using --base-url',
+        )
+        parser.add_argument('--workers', type=int, default=4, help='gunicorn workers with --serve')
+        parser.add_argument(
+            '--server', choices=['asgi', 'wsgi'], default='asgi',
+            help='With --serve: uvicorn workers on the ASGI app (as deployed) or sync workers on the WSGI app',
+        )
+        parser.add_argument('--stripe-latency', type=float, default=0.15, help='Stub Stripe delay (seconds) with --serve')
+        parser.add_argument('--clients', type=int, default=16, help='Concurrent simulated shoppers')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to run for')
+        parser.add_argument('--warmup', type=float, default=3, help='Seconds of unrecorded load first')
+        parser.add_argument('--mix', default=DEFAULT_MIX, help=f'Scenario weights (default {DEFAULT_MIX})')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed for the scenario sequence')
+        parser.add_argument('--output', help='Write the results as JSON here')
+        parser.add_argument('--compare', help='A previous --output file to show p95 and query deltas against')
+
+    def handle(self, *args, **options):
+        if bool(options['base_url']) == options['serve']:
+            raise CommandError('Pass exactly one of --base-url or --serve.')
+        mix = self.parse_mix(options['mix'])
+        catalogue = self.load_catalogue()
+        usernames = list(
+            User.objects.filter(username__startswith='bench', username__contains='-user-')
+            .order_by('-id').values_list('username', flat=True)[:options['clients']]
+        )
+        if 'checkout' in mix and not usernames:
+            self.stdout.write(self.style.WARNING('No seeded customers found; checkout runs the cart scenario instead.'))
+
+        server = None
+        base_url = options['base_url']
+        if options['serve']:
+            base_url, server = self.serve(options)
+        # The same shoppers (and their logins) carry over from the warm-up
+        clients = [
+            Client(base_url, Recorder(), random.Random(options['seed'] * 1000 + i), catalogue,
+                   usernames[i % len(usernames)] if usernames else None)
+            for i in range(options['clients'])
+        ]
+        try:
+            if options['warmup']:
+                self.run(clients, mix, options['warmup'], Recorder())
+            recorder = Recorder()
+            elapsed = self.run(clients, mix, options['duration'], recorder)
+        finally:
+            if server:
+                self.stop(server)
+
+        endpoints = recorder.summary(elapsed)
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)['endpoints']
+        self.report(endpoints, elapsed, baseline)
+
+        if options['output']:
+            result = {
+                'commit': self.git_commit(),
+                'finished_at': datetime.now(timezone.utc).isoformat(),
+                'database': settings.DATABASES['default']['ENGINE'],
+                'config': {
+                    key: options[key]
+                    for key in ('base_url', 'serve', 'server', 'workers', 'stripe_latency', 'clients', 'duration', 'mix', 'seed')
+                },
+                'catalogue': {'products': len(catalogue['ids']), 'categories': len(catalogue['categories'])},
+                'duration': round(elapsed, 2),
+                'endpoints': endpoints,
+            }
+            with open(options['output'], 'w') as f:
+                json.dump(result, f, indent=2)
+            self.stdout.write(f'Wrote {options["output"]}')
+
+    def parse_mix(self, value):
+        mix = {}
+        for part in value.split(','):
+            name, _, weight = part.partition('=')
+            if name not in {'browse', 'search', 'filter', 'cart', 'checkout'}:
+                raise CommandError(f'Unknown scenario "{name}" in --mix')
+            mix[name] = float(weight or 1)
+        return mix
+
+    def load_catalogue(self):
+        products = list(Product.objects.filter(available=True).order_by('?').values_list('id', 'slug')[:2000])
+        if not products:
+            raise CommandError('No products to browse; run `manage.py seed_benchmark` first.')
+        return {
+            'ids': [product_id for product_id, _ in products],
+            'slugs': [slug for _, slug in products],
+            'categories': list(Category.objects.values_list('slug', flat=True)),
+        }
+
+    def run(self, clients, mix, duration, recorder):
+        """Run every client until `duration` seconds have passed; returns the wall time"""
+        deadline = time.perf_counter() + duration
+        scenarios, weights = list(mix), list(mix.values())
+
+        def shopper(client):
+            client.recorder = recorder
+            while time.perf_counter() < deadline:
+                getattr(client, client.rng.choices(scenarios, weights)[0])()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(len(clients)) as executor:
+            for future in [executor.submit(shopper, client) for client in clients]:
+                future.result()
+        return time.perf_counter() - started
+
+    def serve(self, options):
+        """Start the Stripe stub in this process and gunicorn against it"""
+        stub = make_server(port=0, latency=options['stripe_latency'])
+        threading.Thread(target=stub.serve_forever, daemon=True).start()
+        port = free_port()
+        env = dict(
+            os.environ,
+            STRIPE_API_BASE=f'http://127.0.0.1:{stub.server_address[1]}',
+            QUERY_PROFILER_SAMPLE_RATE='1',
+        )
+        if options['server'] == 'asgi':
+            app = ['leather_shop.asgi:application', '--worker-class', 'uvicorn.workers.UvicornWorker']
+        else:
+            app = ['leather_shop.wsgi:application']
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', *app,
+             '--bind', f'127.0.0.1:{port}', '--workers', str(options['workers']), '--log-level', 'warning'],
+            cwd=settings.BASE_DIR, env=env,
+        )
+        base_url = f'http://127.0.0.1:{port}'
+        for _ in range(100):
+            try:
+                requests.get(base_url + '/', timeout=1)
+                break
+            except requests.RequestException:
+                if process.poll() is not None:
+                    stub.shutdown()
+                    raise CommandError('gunicorn exited during startup')
+                time.sleep(0.2)
+        self.stdout.write(
+            f'Serving {options["server"].upper()} on {base_url} ({options["workers"]} workers, '
+            f'Stripe stub {env["STRIPE_API_BASE"]} with {options["stripe_latency"]}s latency)'
+        )
+        return base_url, (process, stub)
+
+    def stop(self, server):
+        process, stub = server
+        process.terminate()
+        process.wait(timeout=30)
+        stub.shutdown()
+        stub.server_close()
+
+    def report(self, endpoints, elapsed, baseline=None):
+        total = sum(stats['requests'] for stats in endpoints.values())
+        errors = sum(stats['errors'] for stats in endpoints.values())
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'\n{total} requests in {elapsed:.1f}s ({total / elapsed:.1f} rps), {errors} errors'
+        ))
+        self.stdout.write(
+            f'  {"endpoint":<22}{"reqs":>7}{"errs":>6}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"rps":>8}{"queries":>9}'
+        )
+        for endpoint, stats in endpoints.items():
+            queries = '-' if stats['queries'] is None else f'{stats["queries"]:.1f}'
+            line = (
+                f'  {endpoint:<22}{stats["requests"]:>7}{stats["errors"]:>6}{stats["p50_ms"]:>9.1f}'
+                f'{stats["p95_ms"]:>9.1f}{stats["p99_ms"]:>9.1f}{stats["rps"]:>8.1f}{queries:>9}'
+            )
+            previous = (baseline or {}).get(endpoint)
+            if previous:
+                line += f'   p95 {stats["p95_ms"] - previous["p95_ms"]:+.1f} ms'
+                if stats['queries'] is not None and previous.get('queries') is not None:
+                    line += f', queries {stats["queries"] - previous["queries"]:+.1f}'
+            style = self.style.ERROR if stats['errors'] else (lambda text: text)
+            self.stdout.write(style(line))
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
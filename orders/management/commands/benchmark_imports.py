@@ -0,0 +1,78 @@
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# What a fresh worker imports before its first request: settings, apps,
+# middleware (the ASGI handler) and every view through the URLconf
+STARTUP = (
+    'import django; django.setup(); '
+    'from django.core.asgi import get_asgi_application; get_asgi_application(); '
+    'from django.urls import get_resolver; get_resolver().url_patterns'
+)
+
+# Heavy packages only needed by some requests; they must stay out of start-up
+LAZY_PACKAGES = ['stripe', 'PIL']
+
+# "import time:       412 |       1290 |   django.utils.functional"
+IMPORT_TIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+class Command(BaseCommand):
+    help = (
+        'Profile process start-up with `python -X importtime`, summarise the cost by '
+        'package and fail if it is over budget or imports a package that should be lazy.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help='Runs to take the fastest of')
+        parser.add_argument('--budget-ms', type=float, default=600, help='Fail above this total import time')
+        parser.add_argument('--top', type=int, default=15, help='Packages and modules to list')
+
+    def handle(self, *args, **options):
+        runs = [self.profile() for _ in range(options['repeat'])]
+        # The fastest run has the least scheduling noise
+        modules = min(runs, key=lambda run: sum(self_us for self_us, _ in run.values()))
+        total_ms = sum(self_us for self_us, _ in modules.values()) / 1000
+
+        by_package = defaultdict(int)
+        for name, (self_us, _) in modules.items():
+            by_package[name.split('.')[0]] += self_us
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'Start-up imports: {len(modules)} modules in {total_ms:.0f} ms (best of {len(runs)})'
+        ))
+        self.stdout.write('\n  By package (self time)')
+        for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f'  {package:<40}{self_us / 1000:8.1f} ms')
+        self.stdout.write('\n  Slowest modules (cumulative)')
+        for name, (_, cumulative_us) in sorted(modules.items(), key=lambda item: -item[1][1])[:options['top']]:
+            self.stdout.write(f'  {name:<40}{cumulative_us / 1000:8.1f} ms')
+
+        failures = [f'{package} is imported at start-up' for package in LAZY_PACKAGES if package in by_package]
+        if total_ms > options['budget_ms']:
+            failures.append(f'start-up imports take {total_ms:.0f} ms (budget {options["budget_ms"]:.0f} ms)')
+        if failures:
+            raise CommandError('\n  '.join(['Start-up regression:', *failures]))
+        self.stdout.write(self.style.SUCCESS(f'\nWithin the {options["budget_ms"]:.0f} ms budget, nothing lazy imported.'))
+
+    def profile(self):
+        """{module: (self µs, cumulative µs)} for one fresh interpreter"""
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'leather_shop.settings'))
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(f'Start-up failed:\n{result.stderr[-2000:]}')
+        modules = {}
+        for line in result.stderr.splitlines():
+            match = IMPORT_TIME.match(line)
+            if match:
+                modules[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+        return modules
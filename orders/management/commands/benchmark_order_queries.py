@@ -0,0 +1,165 @@
+import re
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from orders.models import Order, OrderItem
+from orders.search import search_orders
+from products.models import Category, Product
+
+
+# A full table scan of the order tables, as reported by PostgreSQL and SQLite
+SEQUENTIAL_SCAN = re.compile(
+    r'Seq Scan on "?(orders_order|orders_orderitem)"?\b'
+    r'|\bSCAN (orders_order|orders_orderitem)\b(?! USING)'
+)
+
+# Any walk over a whole table or index; only acceptable for LIMITed listings
+FULL_SCAN = re.compile(
+    r'Seq Scan on "?(orders_order|orders_orderitem)"?\b'
+    r'|\bSCAN (orders_order|orders_orderitem)\b'
+)
+
+# Most orders end up delivered; only a small slice is waiting on staff
+STATUS_WEIGHTS = [
+    ('delivered', 70),
+    ('shipped', 10),
+    ('processing', 8),
+    ('cancelled', 7),
+    ('pending', 5),
+]
+
+
+class Rollback(Exception):
+    """Raised to discard the seeded benchmark data"""
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a large order dataset inside a transaction, capture EXPLAIN plans '
+        'for the hot order queries and fail if any of them scans a whole table.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=50000, help='Number of orders to seed')
+        parser.add_argument('--users', type=int, default=2000, help='Number of customers to seed')
+        parser.add_argument('--products', type=int, default=200, help='Number of products to seed')
+        parser.add_argument('--batch-size', type=int, default=5000, help='bulk_create batch size')
+
+    def handle(self, *args, **options):
+        failures = []
+        try:
+            with transaction.atomic():
+                started = time.perf_counter()
+                sample = self.seed(options)
+                self.stdout.write(f'Seeded {options["orders"]} orders in {time.perf_counter() - started:.1f}s')
+
+                for name, queryset, scan_allowed in self.hot_queries(sample):
+                    plan = queryset.explain()
+                    regressed = bool((SEQUENTIAL_SCAN if scan_allowed else FULL_SCAN).search(plan))
+                    if regressed:
+                        failures.append(name)
+                    style = self.style.ERROR if regressed else self.style.SUCCESS
+                    self.stdout.write(style(f'\n{name}: {"SEQUENTIAL SCAN" if regressed else "ok"}'))
+                    self.stdout.write(plan)
+
+                # Never leave benchmark rows behind
+                raise Rollback
+        except Rollback:
+            pass
+
+        if failures:
+            raise CommandError(f'Sequential scan on hot queries: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('\nAll hot order queries use an index.'))
+
+    def seed(self, options):
+        """Bulk-create customers, products, orders and order items"""
+        batch_size = options['batch_size']
+        prefix = f'bench-{int(time.time())}'
+
+        category = Category.objects.create(name='Benchmark', slug=prefix)
+        products = Product.objects.bulk_create([
+            Product(
+                category=category,
+                name=f'Benchmark Jacket {i}',
+                slug=f'{prefix}-{i}',
+                description='Benchmark product',
+                price=Decimal('149.99'),
+                color='Black',
+                available_sizes='S,M,L,XL',
+                stock_quantity=10,
+            )
+            for i in range(options['products'])
+        ], batch_size=batch_size)
+        users = User.objects.bulk_create([
+            User(username=f'{prefix}-{i}', email=f'{prefix}-{i}@example.com')
+            for i in range(options['users'])
+        ], batch_size=batch_size)
+
+        statuses = [status for status, weight in STATUS_WEIGHTS for _ in range(weight)]
+        orders = Order.objects.bulk_create([
+            Order(
+                user=users[i % len(users)],
+                full_name=f'Customer {i}',
+                email=f'{prefix}-{i % len(users)}@example.com',
+                phone='+44 20 1234 5678',
+                address_line_1=f'{i} High Street',
+                city='London',
+                postcode='SW1A 1AA',
+                status=statuses[i % len(statuses)],
+                paid=statuses[i % len(statuses)] != 'pending',
+                subtotal=Decimal('149.99'),
+                shipping_cost=Decimal('0.00'),
+                vat=Decimal('30.00'),
+                total_amount=Decimal('179.99'),
+                amount_paid_online=Decimal('179.99'),
+                stripe_payment_intent=f'pi_{prefix}_{i}' if i % 10 else '',
+            )
+            for i in range(options['orders'])
+        ], batch_size=batch_size)
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product=products[(i + n) % len(products)],
+                size='M',
+                price=Decimal('149.99'),
+                quantity=1,
+            )
+            for i, order in enumerate(orders)
+            for n in range(1 + i % 3)
+        ], batch_size=batch_size)
+
+        # Give the planner statistics for the freshly seeded tables
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        return {
+            'user': users[len(users) // 2],
+            'order': orders[len(orders) // 2],
+            'payment_intent': f'pi_{prefix}_{len(orders) // 2 + 1}',
+            'product': products[len(products) // 2],
+            'order_ids': [order.id for order in orders[:10]],
+        }
+
+    def hot_queries(self, sample):
+        """The order queries issued on every customer, staff and webhook request"""
+        return [
+            ('order_list (user, newest first)',
+             Order.objects.filter(user=sample['user']).order_by('-created_at')[:10], False),
+            ('admin_order_list (status, newest first)',
+             Order.objects.filter(status='pending').order_by('-created_at')[:50], False),
+            # Walking the created_at index backwards is fine behind a LIMIT
+            ('admin_order_list (all, newest first)',
+             Order.objects.order_by('-created_at')[:50], True),
+            ('stripe_webhook (order id)',
+             Order.objects.filter(id=sample['order'].id), False),
+            ('staff search (payment intent)',
+             search_orders(sample['payment_intent'], Order.objects.all()), False),
+            ('order items prefetch (order ids)',
+             OrderItem.objects.filter(order_id__in=sample['order_ids']), False),
+            ('sales by product (order items)',
+             OrderItem.objects.filter(product=sample['product']), False),
+        ]
@@ -0,0 +1,97 @@
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.template.loader import get_template
+from django.test import Client
+from django.test.utils import ContextList, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from products.models import Product
+
+
+# (url name, who is logged in): the pages that carry the full base.html chrome
+PAGES = [
+    ('home', None),
+    ('home', 'customer'),
+    ('home', 'staff'),
+    ('products:product_list', None),
+    ('products:product_detail', None),
+    ('products:product_detail', 'customer'),
+    ('cart:cart_detail', 'customer'),
+]
+
+
+class Rollback(Exception):
+    """Raised to discard the sessions created by force_login()"""
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the CPU time spent rendering each page\'s template, context processors '
+        'included, against the current database. Views and middleware are left out.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--renders', type=int, default=200, help='Renders per page, after one warm-up')
+
+    def handle(self, *args, **options):
+        product = Product.objects.filter(available=True).only('slug').first()
+        customer = User.objects.filter(is_staff=False, is_active=True).first()
+        staff = User.objects.filter(is_staff=True, is_active=True).first()
+        if not (product and customer and staff):
+            raise CommandError('Needs an available product, a customer and a staff user (try seed_benchmark).')
+
+        # Test Client, and response.context to re-render from
+        setup_test_environment()
+        try:
+            with transaction.atomic():
+                results = self.measure(options['renders'], product, {'customer': customer, 'staff': staff})
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            teardown_test_environment()
+
+        self.stdout.write(f'  {"page":<42}{"median µs":>12}{"p95 µs":>10}')
+        for (name, role), timings in results.items():
+            timings.sort()
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            self.stdout.write(
+                f'  {name + " (" + (role or "anonymous") + ")":<42}'
+                f'{statistics.median(timings) * 1e6:>12.0f}{p95 * 1e6:>10.0f}'
+            )
+        total = sum(statistics.median(timings) for timings in results.values())
+        self.stdout.write(self.style.SUCCESS(f'\n  Median total {total * 1e6:.0f} µs over {len(results)} pages'))
+
+    def measure(self, renders, product, users):
+        """{(url name, role): [CPU seconds per render]}"""
+        clients = {None: Client()}
+        for role, user in users.items():
+            clients[role] = Client()
+            clients[role].force_login(user)
+            clients[role].post(reverse('cart:cart_add', args=[product.id]), {'size': 'M', 'quantity': 1})
+            clients[role].get(reverse('cart:cart_detail'))  # Shows, and so clears, the "added" message
+
+        results = {}
+        for name, role in PAGES:
+            url = reverse(name, args=[product.slug]) if name == 'products:product_detail' else reverse(name)
+            response = clients[role].get(url)
+            if response.status_code != 200:
+                raise CommandError(f'{name} ({url}) returned HTTP {response.status_code}')
+
+            # The outermost template, with the context its view built
+            context = response.context[0] if isinstance(response.context, ContextList) else response.context
+            template = get_template(response.templates[0].name)
+            data = context.flatten()
+            template.render(data, response.wsgi_request)
+
+            timings = []
+            for _ in range(renders):
+                started = time.process_time()
+                template.render(data, response.wsgi_request)
+                timings.append(time.process_time() - started)
+            results[name, role] = timings
+        return results
@@ -0,0 +1,197 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from leather_shop import cache as app_cache
+from orders.models import Order, OrderItem
+from products.models import Category, Product, ProductReview
+
+
+# (url name, who is logged in, max queries, max rendered KB at the larger size).
+# Query counts must also be the same at every size: a count that grows with
+# the data is an N+1. Tighten a budget when a view gets cheaper.
+# users:profile is left out until the users app has the Profile model it reads.
+BUDGETS = [
+    ('home', None, 1, 30),
+    ('products:product_list', None, 3, 45),
+    ('products:product_list:filtered', None, 4, 45),
+    ('products:product_detail', None, 4, 115),
+    ('cart:cart_detail', 'customer', 4, 190),
+    ('users:login', None, 0, 15),
+    ('users:register', None, 0, 15),
+    ('orders:order_create', 'customer', 4, 80),
+    ('orders:payment', 'customer', 4, 35),
+    ('orders:order_list', 'customer', 6, 125),
+    ('orders:order_detail', 'customer', 4, 105),
+    ('orders:admin_order_list', 'staff', 6, 130),
+    ('orders:admin_order_detail', 'staff', 5, 110),
+    ('orders:sales_report', 'staff', 8, 30),
+]
+
+
+class Rollback(Exception):
+    """Raised to discard the seeded fixtures"""
+
+
+class Command(BaseCommand):
+    help = (
+        'Render every public, customer and staff page against fixtures of two sizes and '
+        'fail if any page\'s query count grows with the data or goes over its budget.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs=2, default=[5, 50], metavar=('SMALL', 'LARGE'),
+            help='Products, reviews, orders, order items and cart lines to seed in each run',
+        )
+
+    def handle(self, *args, **options):
+        # Test Client host, in-memory email; restored afterwards
+        setup_test_environment()
+        try:
+            runs = {size: self.measure(size) for size in options['sizes']}
+        finally:
+            teardown_test_environment()
+
+        small, large = options['sizes']
+        failures = []
+        self.stdout.write(f'  {"view":<34}{"queries":>14}{"budget":>8}{"KB":>8}{"budget":>8}')
+        for name, _, max_queries, max_kb in BUDGETS:
+            (small_queries, _), (large_queries, large_bytes) = runs[small][name], runs[large][name]
+            problems = []
+            if small_queries != large_queries:
+                problems.append(f'{small_queries} queries at size {small}, {large_queries} at {large}')
+            if large_queries > max_queries:
+                problems.append(f'{large_queries} queries, budget {max_queries}')
+            if large_bytes > max_kb * 1024:
+                problems.append(f'{large_bytes / 1024:.0f}KB rendered, budget {max_kb}KB')
+            failures += [f'{name}: {problem}' for problem in problems]
+
+            style = self.style.ERROR if problems else self.style.SUCCESS
+            self.stdout.write(style(
+                f'  {name:<34}{f"{small_queries} / {large_queries}":>14}{max_queries:>8}'
+                f'{large_bytes / 1024:>8.1f}{max_kb:>8}'
+            ))
+
+        if failures:
+            raise CommandError('Query budgets exceeded:\n  ' + '\n  '.join(failures))
+        self.stdout.write(self.style.SUCCESS('\nEvery view is within budget and O(1) in queries.'))
+
+    def measure(self, size):
+        """{budget name: (queries, rendered bytes)} against fixtures of `size`"""
+        results = {}
+        try:
+            with transaction.atomic():
+                fixtures = self.seed(size)
+                for cache in caches.all():
+                    cache.clear()
+                app_cache.l1.clear()
+                clients = {None: Client()}
+                for role in ('customer', 'staff'):
+                    clients[role] = Client()
+                    clients[role].force_login(fixtures[role])
+                self.fill_cart(clients['customer'], fixtures['products'])
+
+                for name, role, _, _ in BUDGETS:
+                    url = self.url(name, fixtures)
+                    with CaptureQueriesContext(connection) as context:
+                        response = clients[role].get(url)
+                    if response.status_code != 200:
+                        raise CommandError(f'{name} ({url}) returned HTTP {response.status_code}')
+                    results[name] = (len(context.captured_queries), len(response.content))
+
+                raise Rollback
+        except Rollback:
+            pass
+        return results
+
+    def url(self, name, fixtures):
+        if name == 'products:product_list:filtered':
+            category = fixtures['category'].slug
+            return reverse('products:product_list') + f'?category={category}&q=jacket&sort=price_low&min_price=10'
+        if name == 'products:product_detail':
+            return reverse(name, args=[fixtures['products'][0].slug])
+        if name in ('orders:order_detail', 'orders:admin_order_detail'):
+            return reverse(name, args=[fixtures['order'].id])
+        if name == 'orders:payment':
+            return reverse(name, args=[fixtures['unpaid_order'].id])
+        return reverse(name)
+
+    def seed(self, size):
+        """`size` products (all featured, one category), reviews of one product and orders"""
+        prefix = f'budget-{size}'
+        category = Category.objects.create(name='Budget Jackets', slug=prefix)
+        products = Product.objects.bulk_create([
+            Product(
+                category=category,
+                name=f'Budget Jacket {i}',
+                slug=f'{prefix}-{i}',
+                description='Budget check product',
+                price=Decimal('149.99'),
+                color='Black',
+                available_sizes='S,M,L,XL',
+                stock_quantity=10,
+                featured=True,
+            )
+            for i in range(size)
+        ])
+        customer = User.objects.create_user(f'{prefix}-customer', f'{prefix}@example.com', 'x')
+        staff = User.objects.create_user(f'{prefix}-staff', f'{prefix}-staff@example.com', 'x', is_staff=True)
+        reviewers = User.objects.bulk_create([
+            User(username=f'{prefix}-reviewer-{i}', email=f'{prefix}-reviewer-{i}@example.com')
+            for i in range(size)
+        ])
+        ProductReview.objects.bulk_create([
+            ProductReview(product=products[0], user=user, rating=5, comment='Lovely leather.')
+            for user in reviewers
+        ])
+
+        orders = Order.objects.bulk_create([
+            Order(
+                user=customer,
+                full_name='Budget Customer',
+                email=customer.email,
+                phone='+44 20 1234 5678',
+                address_line_1='1 High Street',
+                city='London',
+                postcode='SW1A 1AA',
+                status='processing',
+                paid=i > 0,
+                subtotal=Decimal('149.99'),
+                shipping_cost=Decimal('0.00'),
+                vat=Decimal('30.00'),
+                total_amount=Decimal('179.99'),
+                amount_paid_online=Decimal('179.99'),
+            )
+            for i in range(size)
+        ])
+        # The first and last orders carry every product, the rest one line each
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=product, size='M', price=product.price, quantity=1)
+            for i, order in enumerate(orders)
+            for product in (products if i in (0, size - 1) else products[i:i + 1])
+        ])
+        return {
+            'category': category,
+            'products': products,
+            'customer': customer,
+            'staff': staff,
+            'order': orders[-1],
+            'unpaid_order': orders[0],
+        }
+
+    def fill_cart(self, client, products):
+        """One cart line per product, as Cart.add() would store them"""
+        session = client.session
+        session[settings.CART_SESSION_ID] = {
+            f'{product.id}_M': {'product_id': str(product.id), 'size': 'M', 'quantity': 1, 'price': str(product.price)}
+            for product in products
+        }
+        session.save()
@@ -0,0 +1,46 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from leather_shop.db_router import replica_reads
+from orders.exports import filter_orders, stream_export
+from orders.models import ArchivedOrder, Order
+
+
+class Command(BaseCommand):
+    help = 'Stream orders and their lines as CSV or JSON Lines, in constant memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+        parser.add_argument('--start', help='First order date to include (YYYY-MM-DD)')
+        parser.add_argument('--end', help='Last order date to include (YYYY-MM-DD)')
+        parser.add_argument('--status', choices=[status for status, _ in Order.STATUS_CHOICES])
+        parser.add_argument('--output', help='File to write to (default: stdout)')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched per database round trip')
+
+    def handle(self, *args, **options):
+        try:
+            start = parse_date(options['start']) if options['start'] else None
+            end = parse_date(options['end']) if options['end'] else None
+        except ValueError as e:
+            raise CommandError(f'Invalid date: {e}')
+        if (options['start'] and not start) or (options['end'] and not end):
+            raise CommandError('Dates must be in YYYY-MM-DD format.')
+
+        # Live orders first, then the archive
+        orders = [
+            filter_orders(Order.objects.all(), start=start, end=end, status=options['status']),
+            filter_orders(ArchivedOrder.objects.all(), start=start, end=end, status=options['status']),
+        ]
+        chunks = stream_export(orders, options['format'], chunk_size=options['chunk_size'])
+
+        output = open(options['output'], 'w', newline='') if options['output'] else sys.stdout
+        try:
+            # A long read that should not load the primary
+            with replica_reads():
+                for chunk in chunks:
+                    output.write(chunk)
+        finally:
+            if options['output']:
+                output.close()
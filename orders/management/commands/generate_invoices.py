@@ -0,0 +1,30 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from orders.invoices import generate_invoices
+
+
+class Command(BaseCommand):
+    help = 'Background worker that renders PDF invoices for paid orders in a process pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.INVOICE_WORKERS, help='Rendering processes')
+        parser.add_argument('--batch-size', type=int, default=100, help='Orders read per query')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to wait when nothing is due')
+        parser.add_argument('--once', action='store_true', help='Sweep the queue once and exit instead of polling')
+
+    def handle(self, *args, **options):
+        total = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            while True:
+                count = generate_invoices(executor, batch_size=options['batch_size'])
+                total += count
+                if options['once']:
+                    break
+                if not count:
+                    time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Generated {total} invoices.'))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.webhooks import process_pending_events
+
+
+class Command(BaseCommand):
+    help = 'Background worker that applies queued Stripe webhook events to orders.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Events applied per transaction')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the queue and exit instead of polling')
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            count = process_pending_events(batch_size=options['batch_size'])
+            total += count
+            if count:
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {total} Stripe events.'))
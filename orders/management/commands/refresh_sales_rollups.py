@@ -0,0 +1,34 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from orders.reports import refresh_sales_rollups
+
+
+class Command(BaseCommand):
+    help = 'Fold orders changed since the last run into the daily sales rollups.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rebuild every rollup from scratch')
+        parser.add_argument('--overlap', type=int, default=300,
+                            help='Seconds of history before the watermark to re-read (default 300)')
+        parser.add_argument('--interval', type=float,
+                            help='Keep running, refreshing every this many seconds, instead of exiting')
+
+    def handle(self, *args, **options):
+        full = options['full']
+        while True:
+            started = time.perf_counter()
+            days = refresh_sales_rollups(
+                full=full,
+                overlap=timedelta(seconds=options['overlap']),
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'Rebuilt rollups for {days} day{"s" if days != 1 else ""} in {time.perf_counter() - started:.2f}s.'
+            ))
+            if options['interval'] is None:
+                break
+            # Only the first pass is a full rebuild
+            full = False
+            time.sleep(options['interval'])
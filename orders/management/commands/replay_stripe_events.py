@@ -0,0 +1,142 @@
+import hashlib
+import hmac
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory
+
+from orders.models import Order, StripeEvent
+from orders.views import stripe_webhook
+from orders.webhooks import process_pending_events
+
+
+class Rollback(Exception):
+    """Raised to discard the replayed events and the orders they paid"""
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay a burst of signed Stripe events through the webhook endpoint inside '
+        'a transaction, then drain the queue, report timings and effects and roll back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('fixture', nargs='?', help='JSON file containing a list of Stripe events')
+        parser.add_argument('--synthesize', type=int, default=0,
+                            help='Build payment_intent.succeeded events for this many pending orders instead')
+        parser.add_argument('--copies', type=int, default=2,
+                            help='Deliver each synthesized event this many times, like Stripe redeliveries')
+        parser.add_argument('--output', help='Write the synthesized events to this fixture file')
+        parser.add_argument('--no-process', action='store_true', help='Only queue the events')
+
+    def handle(self, *args, **options):
+        if options['fixture']:
+            with open(options['fixture']) as f:
+                events = json.load(f)
+        elif options['synthesize']:
+            events = self.synthesize(options['synthesize'], options['copies'])
+            if options['output']:
+                with open(options['output'], 'w') as f:
+                    json.dump(events, f)
+        else:
+            raise CommandError('Pass a fixture file or --synthesize COUNT.')
+
+        try:
+            with transaction.atomic():
+                self.replay(events, options)
+                # The events name real orders; never leave them marked paid
+                raise Rollback
+        except Rollback:
+            pass
+
+    def replay(self, events, options):
+        """Deliver the events, drain the queue and report"""
+        factory = RequestFactory()
+        timings = []
+        statuses = {}
+        started = time.perf_counter()
+        for event in events:
+            payload = json.dumps(event)
+            request = factory.post(
+                '/orders/webhook/stripe/',
+                data=payload,
+                content_type='application/json',
+                HTTP_STRIPE_SIGNATURE=self.sign(payload),
+            )
+            request_started = time.perf_counter()
+            response = stripe_webhook(request)
+            timings.append((time.perf_counter() - request_started) * 1000)
+            status = json.loads(response.content).get('status', response.status_code)
+            statuses[status] = statuses.get(status, 0) + 1
+        elapsed = time.perf_counter() - started
+
+        timings.sort()
+        self.stdout.write(f'Delivered {len(events)} events in {elapsed:.2f}s ({len(events) / elapsed:.0f}/s)')
+        self.stdout.write(f'Responses: {statuses}')
+        self.stdout.write(
+            f'ACK latency: p50 {statistics.median(timings):.2f}ms, '
+            f'p99 {timings[int(len(timings) * 0.99) - 1]:.2f}ms'
+        )
+
+        if options['no_process']:
+            return
+
+        started = time.perf_counter()
+        processed = 0
+        while True:
+            count = process_pending_events(batch_size=500)
+            if not count:
+                break
+            processed += count
+        elapsed = time.perf_counter() - started
+
+        event_ids = {event['id'] for event in events}
+        unprocessed = StripeEvent.objects.filter(
+            event_id__in=event_ids, processed_at__isnull=True
+        ).count()
+        self.stdout.write(f'Worker applied {processed} events in {elapsed:.2f}s')
+        style = self.style.SUCCESS if not unprocessed else self.style.ERROR
+        self.stdout.write(style(f'{len(event_ids)} unique events, {unprocessed} left unprocessed'))
+
+    def sign(self, payload):
+        """Build a Stripe-Signature header for the configured webhook secret"""
+        timestamp = int(time.time())
+        signature = hmac.new(
+            settings.STRIPE_WEBHOOK_SECRET.encode('utf-8'),
+            f'{timestamp}.{payload}'.encode('utf-8'),
+            hashlib.sha256,
+        ).hexdigest()
+        return f't={timestamp},v1={signature}'
+
+    def synthesize(self, count, copies):
+        """One payment_intent.succeeded event per pending order, each delivered several times"""
+        orders = Order.objects.filter(status='pending').values_list(
+            'id', 'user_id', 'payment_method', 'amount_paid_online'
+        )[:count]
+        prefix = int(time.time())
+        events = []
+        for order_id, user_id, payment_method, amount in orders:
+            event = {
+                'id': f'evt_replay_{prefix}_{order_id}',
+                'type': 'payment_intent.succeeded',
+                'created': prefix,
+                'data': {
+                    'object': {
+                        'id': f'pi_replay_{prefix}_{order_id}',
+                        'object': 'payment_intent',
+                        'amount': int(amount * 100),
+                        'currency': 'gbp',
+                        'metadata': {
+                            'order_id': str(order_id),
+                            'user_id': str(user_id),
+                            'payment_type': payment_method,
+                        },
+                    },
+                },
+            }
+            events.extend([event] * copies)
+        return events
@@ -0,0 +1,228 @@
+import io
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from leather_shop import cache as app_cache
+from orders.models import Order, OrderItem
+from products.models import Category, Product, ProductReview
+
+
+CATEGORY_NAMES = ['Biker', 'Bomber', 'Aviator', 'Racer', 'Blazer', 'Trench', 'Shearling', 'Gilet', 'Parka', 'Field']
+STYLES = ['Classic', 'Vintage', 'Slim Fit', 'Oversized', 'Distressed', 'Quilted', 'Hooded', 'Belted', 'Cropped', 'Longline']
+COLORS = ['Black', 'Brown', 'Tan', 'Burgundy', 'Navy', 'Olive', 'Cognac', 'Grey']
+MATERIALS = ['Genuine Leather', 'Lambskin', 'Cowhide', 'Suede', 'Nubuck']
+SIZES = ['XS', 'S', 'M', 'L', 'XL', 'XXL']
+CITIES = [('London', 'SW1A 1AA'), ('Manchester', 'M1 1AE'), ('Leeds', 'LS1 4DY'), ('Bristol', 'BS1 4ST'),
+          ('Glasgow', 'G1 1XQ'), ('Cardiff', 'CF10 1EP'), ('Birmingham', 'B1 1BB'), ('Liverpool', 'L1 8JQ')]
+
+# Most orders end up delivered; only a small slice is waiting on staff
+STATUS_WEIGHTS = {'delivered': 70, 'shipped': 10, 'processing': 8, 'cancelled': 7, 'pending': 5}
+
+# Every seeded customer can log in with this, so `manage.py bench` can check out
+BENCH_PASSWORD = 'bench-password'
+
+
+@contextmanager
+def keep_timestamps(model):
+    """Let bulk_create keep back-dated created_at/updated_at instead of stamping now"""
+    fields = [model._meta.get_field('created_at'), model._meta.get_field('updated_at')]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk-generate a realistic catalogue, customers, reviews and a year of orders '
+        'for load testing (see `manage.py bench`). Rows are kept; use a scratch database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=10)
+        parser.add_argument('--products', type=int, default=5000)
+        parser.add_argument('--images', type=int, default=24, help='Distinct placeholder images shared by the products')
+        parser.add_argument('--users', type=int, default=20000)
+        parser.add_argument('--reviews', type=int, default=20000)
+        parser.add_argument('--orders', type=int, default=100000)
+        parser.add_argument('--batch-size', type=int, default=10000, help='Rows per bulk_create')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed, for repeatable datasets')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = f'bench{options["seed"]}-{int(time.time())}'
+        started = time.perf_counter()
+
+        categories = self.step('categories', self.seed_categories, options['categories'])
+        images = self.step('images', self.seed_images, options['images'])
+        products = self.step('products', self.seed_products, options['products'], categories, images)
+        users = self.step('users', self.seed_users, options['users'])
+        self.step('reviews', self.seed_reviews, options['reviews'], products, users)
+        self.step('orders', self.seed_orders, options['orders'], products, users)
+        # bulk_create() sends no signals to invalidate the cached catalogue
+        app_cache.clear()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded in {time.perf_counter() - started:.1f}s. Customers log in as {self.prefix}-user-<n> '
+            f'with password "{BENCH_PASSWORD}". Run `manage.py refresh_sales_rollups --full` for the sales report.'
+        ))
+
+    def step(self, name, seed, count, *args):
+        started = time.perf_counter()
+        result = seed(count, *args)
+        self.stdout.write(f'  {count:>9} {name:<12} {time.perf_counter() - started:6.1f}s')
+        return result
+
+    def seed_categories(self, count):
+        return Category.objects.bulk_create([
+            Category(
+                name=f'{CATEGORY_NAMES[i % len(CATEGORY_NAMES)]} Jackets {i // len(CATEGORY_NAMES) or ""}'.strip(),
+                slug=f'{self.prefix}-category-{i}',
+                description='Benchmark category',
+            )
+            for i in range(count)
+        ])
+
+    def seed_images(self, count):
+        """Small JPEGs in MEDIA_ROOT, shared between products like a real catalogue's variants"""
+        names = []
+        for i in range(count):
+            buffer = io.BytesIO()
+            colour = tuple(self.rng.randrange(40, 200) for _ in range(3))
+            Image.new('RGB', (600, 600), colour).save(buffer, 'JPEG', quality=80)
+            names.append(default_storage.save(f'products/{self.prefix}-{i}.jpg', buffer))
+        return names
+
+    def seed_products(self, count, categories, images):
+        products = []
+        for start in range(0, count, self.batch_size):
+            batch = []
+            for i in range(start, min(start + self.batch_size, count)):
+                price = Decimal(self.rng.randrange(89, 499)) + Decimal('0.99')
+                style = self.rng.choice(STYLES)
+                category = self.rng.choice(categories)
+                batch.append(Product(
+                    category=category,
+                    name=f'{style} {self.rng.choice(COLORS)} {category.name.split()[0]} Jacket {i}',
+                    slug=f'{self.prefix}-product-{i}',
+                    description=f'{style} jacket in soft {self.rng.choice(MATERIALS).lower()}. ' * 8,
+                    price=price,
+                    discount_price=(price * Decimal('0.8')).quantize(Decimal('0.01')) if self.rng.random() < 0.2 else None,
+                    gender=self.rng.choice('MWU'),
+                    material=self.rng.choice(MATERIALS),
+                    color=self.rng.choice(COLORS),
+                    available_sizes=','.join(SIZES[self.rng.randrange(0, 2):self.rng.randrange(4, 7)]),
+                    stock_quantity=self.rng.randrange(0, 60),
+                    available=self.rng.random() < 0.95,
+                    featured=self.rng.random() < 0.02,
+                    main_image=images[i % len(images)] if images else None,
+                ))
+            products += Product.objects.bulk_create(batch)
+        return products
+
+    def seed_users(self, count):
+        password = make_password(BENCH_PASSWORD)  # Hash once; every customer shares it
+        users = []
+        for start in range(0, count, self.batch_size):
+            users += User.objects.bulk_create([
+                User(
+                    username=f'{self.prefix}-user-{i}',
+                    email=f'{self.prefix}-user-{i}@example.com',
+                    first_name=f'Customer{i}',
+                    password=password,
+                )
+                for i in range(start, min(start + self.batch_size, count))
+            ])
+        return users
+
+    def seed_reviews(self, count, products, users):
+        # One review per (product, user), so draw distinct pairs
+        pairs = set()
+        count = min(count, len(products) * len(users))
+        while len(pairs) < count:
+            pairs.add((self.rng.randrange(len(products)), self.rng.randrange(len(users))))
+        pairs = list(pairs)
+        for start in range(0, len(pairs), self.batch_size):
+            ProductReview.objects.bulk_create([
+                ProductReview(
+                    product=products[p],
+                    user=users[u],
+                    rating=self.rng.choices([1, 2, 3, 4, 5], [2, 3, 10, 35, 50])[0],
+                    comment='Great fit, lovely leather.',
+                )
+                for p, u in pairs[start:start + self.batch_size]
+            ])
+
+    def seed_orders(self, count, products, users):
+        now = timezone.now()
+        statuses = list(STATUS_WEIGHTS)
+        weights = list(STATUS_WEIGHTS.values())
+        vat_rate = Decimal(str(settings.VAT_RATE))
+
+        with keep_timestamps(Order), transaction.atomic():
+            for start in range(0, count, self.batch_size):
+                orders = []
+                lines = []
+                for i in range(start, min(start + self.batch_size, count)):
+                    user = self.rng.choice(users)
+                    city, postcode = self.rng.choice(CITIES)
+                    items = [
+                        (self.rng.choice(products), self.rng.choice(SIZES), self.rng.choices([1, 2, 3], [85, 12, 3])[0])
+                        for _ in range(self.rng.choices([1, 2, 3, 4], [60, 25, 10, 5])[0])
+                    ]
+                    subtotal = sum((product.get_price() * quantity for product, _, quantity in items), Decimal('0'))
+                    shipping = Decimal('0.00') if subtotal >= 50 else Decimal('5.99')
+                    vat = ((subtotal + shipping) * vat_rate).quantize(Decimal('0.01'))
+                    total = subtotal + shipping + vat
+                    status = self.rng.choices(statuses, weights)[0]
+                    partial = self.rng.random() < 0.15
+                    paid = status != 'pending'
+                    created_at = now - timedelta(seconds=self.rng.randrange(365 * 24 * 60 * 60))
+                    orders.append(Order(
+                        user=user,
+                        full_name=f'{user.first_name} Smith',
+                        email=user.email,
+                        phone='+44 20 1234 5678',
+                        address_line_1=f'{self.rng.randrange(1, 300)} High Street',
+                        city=city,
+                        postcode=postcode,
+                        shipping_method='standard',
+                        payment_method='partial' if partial else 'full',
+                        status=status,
+                        paid=paid and not (partial and status != 'delivered'),
+                        partial_payment_received=paid,
+                        subtotal=subtotal,
+                        shipping_cost=shipping,
+                        vat=vat,
+                        total_amount=total,
+                        amount_paid_online=(total / 2).quantize(Decimal('0.01')) if partial else total,
+                        remaining_amount=(total / 2).quantize(Decimal('0.01')) if partial else Decimal('0.00'),
+                        stripe_payment_intent=f'pi_{self.prefix}_{i}' if paid else '',
+                        created_at=created_at,
+                        updated_at=created_at,
+                    ))
+                    lines.append(items)
+
+                Order.objects.bulk_create(orders)
+                OrderItem.objects.bulk_create([
+                    OrderItem(order=order, product=product, size=size, price=product.get_price(), quantity=quantity)
+                    for order, items in zip(orders, lines)
+                    for product, size, quantity in items
+                ])
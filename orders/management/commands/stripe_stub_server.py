@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from orders.stripe_stub import make_server
+
+
+class Command(BaseCommand):
+    help = 'Run a local stand-in for the Stripe PaymentIntent API (set STRIPE_API_BASE to use it).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=12111)
+        parser.add_argument('--latency', type=float, default=0.0, help='Seconds to delay every response')
+        parser.add_argument('--verbose', action='store_true', help='Log every request')
+
+    def handle(self, *args, **options):
+        server = make_server(options['host'], options['port'], options['latency'], options['verbose'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Stripe stub listening on http://{options["host"]}:{options["port"]} '
+            f'(STRIPE_API_BASE=http://{options["host"]}:{options["port"]})'
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
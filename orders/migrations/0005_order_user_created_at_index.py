@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_order_amount_paid_online_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', '-created_at'], name='orders_orde_user_id_0ae59f_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_order_user_created_at_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', '-created_at'], name='orders_orde_status_079368_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['-created_at'], name='orders_orde_created_f0ce29_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='order',
+            constraint=models.UniqueConstraint(condition=models.Q(('stripe_payment_intent', ''), _negated=True), fields=('stripe_payment_intent',), name='orders_order_unique_payment_intent'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_order_status_created_at_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StripeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=255, unique=True)),
+                ('event_type', models.CharField(max_length=100)),
+                ('payload', models.JSONField()),
+                ('stripe_created', models.BigIntegerField(default=0)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+            options={
+                'ordering': ['stripe_created', 'id'],
+                'indexes': [models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['stripe_created', 'id'], name='orders_stripeevent_queue_idx')],
+            },
+        ),
+    ]
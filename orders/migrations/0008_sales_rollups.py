@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_stripeevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('dimension', models.CharField(choices=[('total', 'All Orders'), ('product', 'Product'), ('category', 'Category'), ('shipping_method', 'Shipping Method'), ('payment_method', 'Payment Method')], max_length=20)),
+                ('key', models.CharField(blank=True, max_length=50)),
+                ('label', models.CharField(blank=True, max_length=200)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('vat', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('shipping', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+            options={
+                'ordering': ['date', 'dimension', 'key'],
+                'indexes': [models.Index(fields=['dimension', 'date'], name='orders_sale_dimensi_0e99ef_idx')],
+                'unique_together': {('date', 'dimension', 'key')},
+            },
+        ),
+    ]
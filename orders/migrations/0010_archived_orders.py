@@ -0,0 +1,75 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0009_order_version'),
+        ('products', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('full_name', models.CharField(max_length=200)),
+                ('email', models.EmailField(max_length=254)),
+                ('phone', models.CharField(max_length=20)),
+                ('address_line_1', models.CharField(max_length=250)),
+                ('address_line_2', models.CharField(blank=True, max_length=250)),
+                ('city', models.CharField(max_length=100)),
+                ('county', models.CharField(blank=True, max_length=100)),
+                ('postcode', models.CharField(max_length=20)),
+                ('shipping_method', models.CharField(choices=[('standard', 'Standard Shipping (5-7 days) - FREE over £50'), ('express', 'Express Shipping (2-3 days) - £9.99'), ('next_day', 'Next Day Delivery - £14.99'), ('international', 'International Shipping (10-15 days) - £24.99')], default='standard', max_length=20)),
+                ('estimated_delivery', models.CharField(blank=True, max_length=100)),
+                ('payment_method', models.CharField(choices=[('full', 'Pay Full Amount Online'), ('partial', 'Pay 50% Now, 50% on Delivery')], default='full', max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('shipped', 'Shipped'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled')], default='pending', max_length=20)),
+                ('paid', models.BooleanField(default=False)),
+                ('partial_payment_received', models.BooleanField(default=False)),
+                ('subtotal', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('shipping_cost', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('vat', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('amount_paid_online', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('remaining_amount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('stripe_payment_intent', models.CharField(blank=True, max_length=250)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_orders', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('size', models.CharField(max_length=10)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='orders.archivedorder')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_order_items', to='products.product')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['user', '-created_at'], name='orders_arch_user_id_6febd8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['-created_at'], name='orders_arch_created_892a6d_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0010_archived_orders'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedorder',
+            name='invoice_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='invoice_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('invoice_hash', ''), models.Q(('paid', True), ('partial_payment_received', True), _connector='OR')), fields=['id'], name='orders_order_invoice_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:25
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+from leather_shop.trigram import AddTrigramIndex
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0011_order_invoice_hash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedorder',
+            name='email_normalised',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Lower('email'), output_field=models.CharField(max_length=254)),
+        ),
+        migrations.AddField(
+            model_name='archivedorder',
+            name='postcode_normalised',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Upper(django.db.models.functions.text.Replace('postcode', models.Value(' '), models.Value(''))), output_field=models.CharField(max_length=20)),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='email_normalised',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Lower('email'), output_field=models.CharField(max_length=254)),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='postcode_normalised',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Upper(django.db.models.functions.text.Replace('postcode', models.Value(' '), models.Value(''))), output_field=models.CharField(max_length=20)),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['email_normalised'], name='orders_arch_email_n_05d4b1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['postcode_normalised'], name='orders_arch_postcod_509779_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['email_normalised'], name='orders_orde_email_n_69c298_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['postcode_normalised'], name='orders_orde_postcod_f6a028_idx'),
+        ),
+        # Serve the staff search's full_name__icontains on PostgreSQL
+        AddTrigramIndex(name='orders_order_name_trgm_idx', table='orders_order', column='full_name'),
+        AddTrigramIndex(name='orders_archived_name_trgm_idx', table='orders_archivedorder', column='full_name'),
+    ]
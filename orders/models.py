@@ -1,10 +1,12 @@
 from django.db import models
+from django.db.models.functions import Lower, Replace, Upper
 from django.contrib.auth.models import User
 from products.models import Product
 from decimal import Decimal
 
 
-class Order(models.Model):
+class OrderBase(models.Model):
+    """Fields and behaviour shared by live and archived orders"""
     STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('processing', 'Processing'),
@@ -25,11 +27,6 @@ class Order(models.Model):
         ('partial', 'Pay 50% Now, 50% on Delivery'),
     ]
     
-    # User and Order Info
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orders')
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
-    
     # Shipping Information
     full_name = models.CharField(max_length=200)
     email = models.EmailField()
@@ -40,6 +37,18 @@ class Order(models.Model):
     county = models.CharField(max_length=100, blank=True)
     postcode = models.CharField(max_length=20)
     
+    # Normalised copies kept by the database, for indexed staff search (orders.search)
+    email_normalised = models.GeneratedField(
+        expression=Lower('email'),
+        output_field=models.CharField(max_length=254),
+        db_persist=True,
+    )
+    postcode_normalised = models.GeneratedField(
+        expression=Upper(Replace('postcode', models.Value(' '), models.Value(''))),
+        output_field=models.CharField(max_length=20),
+        db_persist=True,
+    )
+    
     # Shipping Method
     shipping_method = models.CharField(
         max_length=20, 
@@ -73,7 +82,14 @@ class Order(models.Model):
     # Payment
     stripe_payment_intent = models.CharField(max_length=250, blank=True)
     
+    # Invoice: content hash of the current PDF, blank while one is due (see orders.invoices)
+    invoice_hash = models.CharField(max_length=64, blank=True)
+    
+    # Bumped on every update; guards concurrent writers (see orders.services)
+    version = models.PositiveIntegerField(default=0)
+    
     class Meta:
+        abstract = True
         ordering = ['-created_at']
         
     def __str__(self):
@@ -95,15 +111,146 @@ class Order(models.Model):
                 return '50% Payment Pending'
 
 
-class OrderItem(models.Model):
-    order = models.ForeignKey(Order, related_name='items', on_delete=models.CASCADE)
-    product = models.ForeignKey(Product, related_name='order_items', on_delete=models.CASCADE)
+class Order(OrderBase):
+    # User and Order Info
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orders')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta(OrderBase.Meta):
+        indexes = [
+            # Customer order history and the staff dashboard, newest first
+            models.Index(fields=['user', '-created_at']),
+            models.Index(fields=['status', '-created_at']),
+            models.Index(fields=['-created_at']),
+            models.Index(fields=['email_normalised']),
+            models.Index(fields=['postcode_normalised']),
+            # The invoice worker's queue: paid orders without a current invoice
+            models.Index(
+                fields=['id'],
+                condition=models.Q(invoice_hash='') & (models.Q(paid=True) | models.Q(partial_payment_received=True)),
+                name='orders_order_invoice_queue_idx',
+            ),
+        ]
+        constraints = [
+            # Webhook lookups by payment intent; orders without one are excluded
+            models.UniqueConstraint(
+                fields=['stripe_payment_intent'],
+                condition=~models.Q(stripe_payment_intent=''),
+                name='orders_order_unique_payment_intent',
+            ),
+        ]
+
+
+class ArchivedOrder(OrderBase):
+    """Delivered and cancelled orders moved out of the hot table by orders.archive"""
+    # Copied verbatim from the live order, so no auto_now here
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_orders')
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta(OrderBase.Meta):
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+            models.Index(fields=['-created_at']),
+            models.Index(fields=['email_normalised']),
+            models.Index(fields=['postcode_normalised']),
+        ]
+
+
+class OrderItemBase(models.Model):
     size = models.CharField(max_length=10)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     quantity = models.PositiveIntegerField(default=1)
     
+    class Meta:
+        abstract = True
+    
     def __str__(self):
         return f'{self.quantity} x {self.product.name} ({self.size})'
     
     def get_total_price(self):
-        return self.price * self.quantity
\ No newline at end of file
+        return self.price * self.quantity
+
+
+class OrderItem(OrderItemBase):
+    order = models.ForeignKey(Order, related_name='items', on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, related_name='order_items', on_delete=models.CASCADE)
+
+
+class ArchivedOrderItem(OrderItemBase):
+    order = models.ForeignKey(ArchivedOrder, related_name='items', on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, related_name='archived_order_items', on_delete=models.CASCADE)
+
+
+class StripeEvent(models.Model):
+    """Stripe webhook events, deduplicated by event id and processed by a background worker"""
+    event_id = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    
+    # Stripe's own creation timestamp, used to apply events in order
+    stripe_created = models.BigIntegerField(default=0)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    # Failure tracking
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    
+    class Meta:
+        ordering = ['stripe_created', 'id']
+        indexes = [
+            # The worker's queue: unprocessed events, oldest first
+            models.Index(
+                fields=['stripe_created', 'id'],
+                condition=models.Q(processed_at__isnull=True),
+                name='orders_stripeevent_queue_idx',
+            ),
+        ]
+    
+    def __str__(self):
+        return f'{self.event_type} ({self.event_id})'
+
+
+class SalesRollup(models.Model):
+    """Daily sales totals, pre-aggregated so reports never scan Order/OrderItem"""
+    DIMENSION_CHOICES = [
+        ('total', 'All Orders'),
+        ('product', 'Product'),
+        ('category', 'Category'),
+        ('shipping_method', 'Shipping Method'),
+        ('payment_method', 'Payment Method'),
+    ]
+    
+    date = models.DateField()
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    key = models.CharField(max_length=50, blank=True)
+    label = models.CharField(max_length=200, blank=True)
+    
+    # Measures
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    vat = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    shipping = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    class Meta:
+        ordering = ['date', 'dimension', 'key']
+        unique_together = ['date', 'dimension', 'key']
+        indexes = [
+            models.Index(fields=['dimension', 'date']),
+        ]
+    
+    def __str__(self):
+        return f'{self.date} {self.dimension} {self.key}'.strip()
+
+
+class RollupWatermark(models.Model):
+    """The newest Order.updated_at already folded into the rollups"""
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField()
+    
+    def __str__(self):
+        return f'{self.name}: {self.value}'
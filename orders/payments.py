@@ -0,0 +1,48 @@
+from leather_shop.outbound import run_outbound
+
+
+# Intents in these states can still be confirmed from the payment page
+REUSABLE_STATUSES = {'requires_payment_method', 'requires_confirmation', 'requires_action'}
+
+
+def get_stripe():
+    """The configured stripe module, imported on first use (see orders.stripe_client)"""
+    from .stripe_client import stripe
+    return stripe
+
+
+def get_or_create_payment_intent(order, amount):
+    """
+    Return (intent, created) for charging `amount` on the order.
+    An open intent is reused (and its amount updated if needed) so that
+    reloading the payment page costs one retrieve instead of a new intent.
+    """
+    stripe = get_stripe()
+    amount_in_pence = int(amount * 100)
+    
+    if order.stripe_payment_intent:
+        intent = stripe.PaymentIntent.retrieve(order.stripe_payment_intent)
+        
+        if intent.status in REUSABLE_STATUSES:
+            if intent.amount != amount_in_pence:
+                intent = stripe.PaymentIntent.modify(intent.id, amount=amount_in_pence)
+            return intent, False
+        
+        # Never start a second charge while the first may still go through
+        if intent.status != 'canceled':
+            raise ValueError('A payment for this order is already being processed.')
+    
+    intent = stripe.PaymentIntent.create(
+        amount=amount_in_pence,
+        currency='gbp',
+        metadata={
+            'order_id': order.id,
+            'user_id': order.user_id,
+            'payment_type': order.payment_method,
+        }
+    )
+    return intent, True
+
+
+# For async views: the Stripe calls run on the outbound pool, not the event loop
+aget_or_create_payment_intent = run_outbound(get_or_create_payment_intent)
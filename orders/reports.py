@@ -0,0 +1,199 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Max, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from leather_shop.cache import invalidate
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem, RollupWatermark, SalesRollup
+
+
+WATERMARK_NAME = 'sales_rollups'
+
+# Cached sales summaries (leather_shop.cache); they only change when the rollups do
+SALES_TAG = 'sales'
+
+# Sales are orders some money was received for (the same test as the invoice queue):
+# checkouts abandoned before payment are not, and neither are cancelled orders.
+# Paying bumps Order.updated_at, so the order's day is rebuilt on the next refresh.
+SALES_EXCLUDED_STATUSES = ['cancelled']
+SALES_PAID = Q(paid=True) | Q(partial_payment_received=True)
+
+# Re-read this much history on every run, for transactions that committed late
+DEFAULT_OVERLAP = timedelta(minutes=5)
+
+# Order-level dimensions and the Order field they group by
+ORDER_DIMENSIONS = {
+    'total': None,
+    'shipping_method': 'shipping_method',
+    'payment_method': 'payment_method',
+}
+
+# Item-level dimensions: (key field, label field) relative to OrderItem
+ITEM_DIMENSIONS = {
+    'product': ('product_id', 'product__name'),
+    'category': ('product__category_id', 'product__category__name'),
+}
+
+
+def refresh_sales_rollups(full=False, overlap=DEFAULT_OVERLAP):
+    """
+    Fold orders changed since the last watermark into the daily rollups.
+    Every day touched by a changed order is rebuilt from scratch, so
+    running twice over the same orders is harmless.
+    Returns the number of days rebuilt.
+    """
+    watermark = RollupWatermark.objects.filter(name=WATERMARK_NAME).first()
+    changed = Order.objects.all()
+    if watermark and not full:
+        changed = changed.filter(updated_at__gt=watermark.value - overlap)
+    
+    latest = changed.aggregate(latest=Max('updated_at'))['latest']
+    if latest is None:
+        return 0
+    
+    dates = list(
+        changed.annotate(day=TruncDate('created_at')).values_list('day', flat=True).order_by('day').distinct()
+    )
+    
+    with transaction.atomic():
+        if full:
+            SalesRollup.objects.all().delete()
+        # One pass per run of consecutive days, rather than per day
+        for first, last in day_runs(dates):
+            rebuild_days(first, last)
+        if watermark is None or latest > watermark.value:
+            RollupWatermark.objects.update_or_create(
+                name=WATERMARK_NAME, defaults={'value': latest}
+            )
+        transaction.on_commit(lambda: invalidate(SALES_TAG))
+    
+    return len(dates)
+
+
+def day_runs(dates):
+    """Split sorted dates into (first, last) runs of consecutive days"""
+    runs = []
+    for day in dates:
+        if runs and day - runs[-1][1] == timedelta(days=1):
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return runs
+
+
+def day_bounds(first, last):
+    """created_at bounds for the local days first..last (inclusive), so its index can be used"""
+    return (
+        timezone.make_aware(datetime.combine(first, time.min)),
+        timezone.make_aware(datetime.combine(last + timedelta(days=1), time.min)),
+    )
+
+
+def rebuild_days(first, last):
+    """Replace every rollup row for the days first..last (inclusive), counting live and archived orders"""
+    totals = {}
+    for order_model, item_model in [(Order, OrderItem), (ArchivedOrder, ArchivedOrderItem)]:
+        accumulate_days(totals, first, last, order_model, item_model)
+    
+    SalesRollup.objects.filter(date__range=(first, last)).delete()
+    SalesRollup.objects.bulk_create([
+        SalesRollup(date=day, dimension=dimension, key=key, **measures)
+        for (day, dimension, key), measures in totals.items()
+    ])
+
+
+def accumulate_days(totals, first, last, order_model, item_model):
+    """
+    Add the measures for the days first..last from one pair of order/item
+    tables into `totals`. Four grouped queries cover the whole run of days:
+    orders and units by day and every order-level dimension at once (each
+    dimension is then summed from those rows), and one per item dimension.
+    """
+    start, end = day_bounds(first, last)
+    orders = order_model.objects.filter(SALES_PAID, created_at__gte=start, created_at__lt=end).exclude(
+        status__in=SALES_EXCLUDED_STATUSES
+    ).order_by()
+    items = item_model.objects.filter(
+        Q(order__paid=True) | Q(order__partial_payment_received=True),
+        order__created_at__gte=start, order__created_at__lt=end,
+    ).exclude(
+        order__status__in=SALES_EXCLUDED_STATUSES
+    ).order_by()
+    line_total = ExpressionWrapper(
+        F('price') * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=2)
+    )
+    
+    def add(day, dimension, key, label, **measures):
+        row = totals.setdefault((day, dimension, key), {
+            'label': label, 'orders': 0, 'units': 0,
+            'revenue': Decimal('0'), 'vat': Decimal('0'), 'shipping': Decimal('0'),
+        })
+        for measure, value in measures.items():
+            row[measure] += value or 0
+    
+    order_fields = [field for field in ORDER_DIMENSIONS.values() if field]
+    labels = {field: dict(order_model._meta.get_field(field).choices) for field in order_fields}
+    units = {
+        (day, *keys): quantity
+        for day, *keys, quantity in items.values_list(
+            TruncDate('order__created_at'), *[f'order__{field}' for field in order_fields]
+        ).annotate(Sum('quantity'))
+    }
+    
+    for row in orders.values(*order_fields, day=TruncDate('created_at')).annotate(
+        orders=Count('id'),
+        revenue=Sum('total_amount'),
+        vat=Sum('vat'),
+        shipping=Sum('shipping_cost'),
+    ):
+        day = row['day']
+        for dimension, field in ORDER_DIMENSIONS.items():
+            key = row[field] if field else ''
+            add(
+                day, dimension, key, labels[field].get(key, key) if field else '',
+                orders=row['orders'],
+                units=units.get((day, *(row[field] for field in order_fields))),
+                revenue=row['revenue'],
+                vat=row['vat'],
+                shipping=row['shipping'],
+            )
+    
+    for dimension, (key_field, label_field) in ITEM_DIMENSIONS.items():
+        for row in items.values(key_field, label_field, day=TruncDate('order__created_at')).annotate(
+            orders=Count('order_id', distinct=True),
+            units=Sum('quantity'),
+            revenue=Sum(line_total),
+        ):
+            add(
+                row['day'], dimension, str(row[key_field]), row[label_field],
+                orders=row['orders'],
+                units=row['units'],
+                revenue=row['revenue'],
+            )
+
+
+def summarise_sales(start, end):
+    """Summarise the rollups between two dates (inclusive) for the dashboard"""
+    rollups = SalesRollup.objects.filter(date__range=(start, end)).order_by()
+    measures = {
+        'orders': Sum('orders'),
+        'units': Sum('units'),
+        'revenue': Sum('revenue'),
+        'vat': Sum('vat'),
+        'shipping': Sum('shipping'),
+    }
+    
+    totals = rollups.filter(dimension='total')
+    report = {
+        'totals': totals.aggregate(**measures),
+        'daily': list(totals.values('date', 'orders', 'units', 'revenue').order_by('date')),
+    }
+    for dimension in ['product', 'category', 'shipping_method', 'payment_method']:
+        report[dimension] = list(
+            rollups.filter(dimension=dimension)
+            .values('key', 'label')
+            .annotate(**measures)
+            .order_by('-revenue')
+        )
+    return report
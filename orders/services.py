@@ -0,0 +1,143 @@
+import logging
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import F, Prefetch
+from django.utils import timezone
+from .emails import send_status_change_email
+from .invoices import INVOICE_FIELDS
+from .models import Order, OrderItem
+
+logger = logging.getLogger(__name__)
+
+
+# Status changes staff may make in bulk; anything else is rejected
+ALLOWED_TRANSITIONS = {
+    'pending': {'processing', 'cancelled'},
+    'processing': {'shipped', 'cancelled'},
+    'shipped': {'delivered'},
+    'delivered': set(),
+    'cancelled': set(),
+}
+
+
+class OrderConflict(Exception):
+    """The order changed since it was read; reload it and retry"""
+
+
+def update_order(order, **changes):
+    """
+    Write only `changes` to the order, provided nobody else has updated it
+    since it was read. Raises OrderConflict instead of overwriting their change.
+    """
+    if INVOICE_FIELDS.intersection(changes):
+        # Queue a new invoice; the worker skips rendering if the printed data is unchanged
+        changes['invoice_hash'] = ''
+    
+    now = timezone.now()
+    updated = Order.objects.filter(id=order.id, version=order.version).update(
+        version=F('version') + 1,
+        updated_at=now,
+        **changes
+    )
+    if not updated:
+        raise OrderConflict(f'Order #{order.id} was changed by another request.')
+    
+    for field, value in changes.items():
+        setattr(order, field, value)
+    order.version += 1
+    order.updated_at = now
+    return order
+
+
+def can_transition(old_status, new_status):
+    return new_status in ALLOWED_TRANSITIONS.get(old_status, set())
+
+
+def bulk_transition(order_ids, new_status, notify=True):
+    """
+    Move many orders to `new_status` with one conditional UPDATE per current
+    status, then email the customers over a single mail connection.
+    Returns a result dict per order: order_id, success, message and
+    email_sent (None when no email was due).
+    """
+    labels = dict(Order.STATUS_CHOICES)
+    order_ids = list(dict.fromkeys(order_ids))
+    results = {}
+    moved = {}
+    
+    with transaction.atomic():
+        current = dict(
+            Order.objects.select_for_update().filter(id__in=order_ids).values_list('id', 'status')
+        )
+        
+        # Validate every order before touching any of them
+        groups = {}
+        for order_id in order_ids:
+            old_status = current.get(order_id)
+            if old_status is None:
+                results[order_id] = (False, 'Order not found.')
+            elif old_status == new_status:
+                results[order_id] = (False, f'Already {labels[new_status]}.')
+            elif not can_transition(old_status, new_status):
+                results[order_id] = (False, f'Cannot change from {labels[old_status]} to {labels[new_status]}.')
+            else:
+                groups.setdefault(old_status, []).append(order_id)
+        
+        # UPDATE ... WHERE id IN (...) AND status = old
+        now = timezone.now()
+        for old_status, ids in groups.items():
+            updated = Order.objects.filter(id__in=ids, status=old_status).update(
+                status=new_status, updated_at=now, version=F('version') + 1
+            )
+            if updated == len(ids):
+                changed = set(ids)
+            else:
+                changed = set(Order.objects.filter(
+                    id__in=ids, status=new_status, updated_at=now
+                ).values_list('id', flat=True))
+            for order_id in ids:
+                if order_id in changed:
+                    moved[order_id] = old_status
+                else:
+                    results[order_id] = (False, 'Status was changed by someone else.')
+    
+    emails = send_transition_emails(moved, new_status) if notify else {}
+    
+    for order_id, old_status in moved.items():
+        message = f'{labels[old_status]} to {labels[new_status]}'
+        if emails.get(order_id) is True:
+            message += ' (email sent)'
+        elif emails.get(order_id) is False:
+            message += ' (email sending failed)'
+        results[order_id] = (True, message)
+    
+    return [
+        {
+            'order_id': order_id,
+            'success': results[order_id][0],
+            'message': results[order_id][1],
+            'email_sent': emails.get(order_id),
+        }
+        for order_id in order_ids
+    ]
+
+
+def send_transition_emails(old_statuses, new_status):
+    """Send the status emails for a batch of orders over one mail connection"""
+    items = OrderItem.objects.select_related('product').only(
+        'order_id', 'size', 'price', 'quantity', 'product__name'
+    )
+    orders = Order.objects.filter(id__in=old_statuses).prefetch_related(Prefetch('items', queryset=items))
+    
+    sent = {}
+    try:
+        with get_connection() as connection:
+            for order in orders:
+                sent[order.id] = send_status_change_email(
+                    order, old_statuses[order.id], new_status, connection=connection
+                )
+    except Exception:
+        logger.exception('Email error while sending status change emails')
+        for order_id in old_statuses:
+            sent.setdefault(order_id, False)
+    return sent
@@ -0,0 +1,37 @@
+"""
+The Stripe SDK, configured for the shop.
+
+Importing stripe takes about a third of a second, so nothing imports this
+module at start-up; code that talks to Stripe calls
+orders.payments.get_stripe(), which imports it on first use.
+"""
+import re
+
+import stripe
+from django.conf import settings
+
+from leather_shop.metrics import observe_call
+
+
+# Stripe object ids in API paths: /v1/payment_intents/pi_123 -> /v1/payment_intents/{id}
+STRIPE_ID = re.compile(r'/(?=[^/]*\d)[a-z]+_[A-Za-z0-9_]+')
+
+
+class MeteredRequestsClient(stripe.RequestsClient):
+    """Stripe HTTP client that records the latency of every API call"""
+    
+    def request(self, method, url, headers, post_data=None):
+        path = STRIPE_ID.sub('/{id}', re.sub(r'^https?://[^/]+', '', url).split('?')[0])
+        with observe_call('stripe', f'{method.upper()} {path}'):
+            return super().request(method, url, headers, post_data)
+
+
+# Set up Stripe
+stripe.api_key = settings.STRIPE_SECRET_KEY
+stripe.api_base = settings.STRIPE_API_BASE
+stripe.max_network_retries = settings.STRIPE_MAX_NETWORK_RETRIES
+
+# Keep-alive session per worker thread, with explicit (connect, read) timeouts
+stripe.default_http_client = MeteredRequestsClient(
+    timeout=(settings.STRIPE_CONNECT_TIMEOUT, settings.STRIPE_READ_TIMEOUT)
+)
@@ -0,0 +1,105 @@
+"""
+A tiny stand-in for the Stripe API, for tests and load tests.
+
+Implements just the PaymentIntent endpoints the shop uses and keeps
+intents in memory. Set STRIPE_API_BASE to the server's address to use it.
+"""
+import json
+import re
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+
+PAYMENT_INTENT_URL = re.compile(r'^/v1/payment_intents(?:/(?P<id>[\w]+))?/?$')
+
+
+def parse_form(body):
+    """Decode Stripe's form encoding, folding `metadata[key]=value` into dicts"""
+    data = {}
+    for key, value in parse_qsl(body, keep_blank_values=True):
+        match = re.match(r'^(\w+)\[(\w+)\]$', key)
+        if match:
+            data.setdefault(match.group(1), {})[match.group(2)] = value
+        else:
+            data[key] = value
+    return data
+
+
+class StripeStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        match = PAYMENT_INTENT_URL.match(self.path)
+        if not match or not match.group('id'):
+            return self.send_error_json(404, 'Unrecognized request URL')
+        self.simulate_latency()
+        intent = self.server.intents.get(match.group('id'))
+        if intent is None:
+            return self.send_error_json(404, f"No such payment_intent: '{match.group('id')}'")
+        self.send_json(200, intent)
+
+    def do_POST(self):
+        match = PAYMENT_INTENT_URL.match(self.path)
+        if not match:
+            return self.send_error_json(404, 'Unrecognized request URL')
+        length = int(self.headers.get('Content-Length') or 0)
+        data = parse_form(self.rfile.read(length).decode('utf-8'))
+        self.simulate_latency()
+
+        with self.server.lock:
+            if match.group('id'):
+                intent = self.server.intents.get(match.group('id'))
+                if intent is None:
+                    return self.send_error_json(404, f"No such payment_intent: '{match.group('id')}'")
+                if 'amount' in data:
+                    intent['amount'] = int(data['amount'])
+                intent['metadata'].update(data.get('metadata', {}))
+            else:
+                intent_id = f'pi_stub_{secrets.token_hex(12)}'
+                intent = {
+                    'id': intent_id,
+                    'object': 'payment_intent',
+                    'amount': int(data.get('amount', 0)),
+                    'currency': data.get('currency', 'gbp'),
+                    'client_secret': f'{intent_id}_secret_{secrets.token_hex(12)}',
+                    'created': int(time.time()),
+                    'livemode': False,
+                    'metadata': data.get('metadata', {}),
+                    'status': 'requires_payment_method',
+                }
+                self.server.intents[intent_id] = intent
+        self.send_json(200, intent)
+
+    def simulate_latency(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+    def send_error_json(self, status, message):
+        self.send_json(status, {'error': {'type': 'invalid_request_error', 'message': message}})
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Request-Id', f'req_stub_{secrets.token_hex(8)}')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def make_server(host='127.0.0.1', port=12111, latency=0.0, verbose=False):
+    """Build a threaded stub server; `latency` (seconds) simulates a slow Stripe API"""
+    server = ThreadingHTTPServer((host, port), StripeStubHandler)
+    server.daemon_threads = True
+    server.intents = {}
+    server.lock = threading.Lock()
+    server.latency = latency
+    server.verbose = verbose
+    return server
@@ -0,0 +1,55 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from orders.models import Order, OrderItem, SalesRollup
+from orders.reports import refresh_sales_rollups
+from orders.services import update_order
+from products.models import Category, Product
+
+
+class SalesRollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('shopper', 'shopper@example.com', 'password')
+        category = Category.objects.create(name='Jackets', slug='jackets')
+        self.product = Product.objects.create(
+            category=category, name='Biker Jacket', slug='biker-jacket', description='', price=Decimal('200.00'),
+        )
+
+    def create_order(self, **fields):
+        order = Order.objects.create(
+            user=self.user, full_name='A Shopper', email='shopper@example.com', phone='0123',
+            address_line_1='1 High Street', city='London', postcode='SW1A 1AA',
+            subtotal=Decimal('200.00'), shipping_cost=Decimal('0.00'), vat=Decimal('40.00'),
+            total_amount=Decimal('240.00'), **fields,
+        )
+        OrderItem.objects.create(order=order, product=self.product, size='M', price=Decimal('200.00'), quantity=1)
+        return order
+
+    def test_only_paid_orders_are_sales(self):
+        self.create_order(status='processing', paid=True, partial_payment_received=True)
+        self.create_order(status='processing', payment_method='partial', partial_payment_received=True)
+        # A checkout that never got as far as paying
+        self.create_order(status='pending')
+        self.create_order(status='cancelled', paid=True, partial_payment_received=True)
+
+        refresh_sales_rollups(full=True)
+
+        today = timezone.localdate()
+        total = SalesRollup.objects.get(date=today, dimension='total')
+        self.assertEqual(total.orders, 2)
+        self.assertEqual(total.units, 2)
+        self.assertEqual(total.revenue, Decimal('480.00'))
+        product = SalesRollup.objects.get(date=today, dimension='product', key=str(self.product.id))
+        self.assertEqual((product.orders, product.units, product.revenue), (2, 2, Decimal('400.00')))
+
+    def test_order_counts_once_it_is_paid(self):
+        order = self.create_order(status='pending')
+        refresh_sales_rollups()
+        self.assertFalse(SalesRollup.objects.filter(dimension='total').exists())
+
+        update_order(order, status='processing', paid=True, partial_payment_received=True)
+        refresh_sales_rollups()
+        self.assertEqual(SalesRollup.objects.get(dimension='total').orders, 1)
@@ -7,9 +7,14 @@ urlpatterns = [
     path('create/', views.order_create, name='order_create'),
     path('payment/<int:order_id>/', views.payment, name='payment'),
     path('detail/<int:order_id>/', views.order_detail, name='order_detail'),
+    path('detail/<int:order_id>/invoice/', views.order_invoice, name='order_invoice'),
+    path('detail/<int:order_id>/invoice/<str:digest>.pdf', views.order_invoice, name='order_invoice_file'),
     path('my-orders/', views.order_list, name='order_list'),
+    path('webhook/stripe/', views.stripe_webhook, name='stripe_webhook'),
     
     # Admin URLs
     path('admin/orders/', views.admin_order_list, name='admin_order_list'),
     path('admin/orders/<int:order_id>/', views.admin_order_detail, name='admin_order_detail'),
+    path('admin/orders/bulk-status/', views.admin_order_bulk_status, name='admin_order_bulk_status'),
+    path('admin/reports/sales/', views.sales_report, name='sales_report'),
 ]
\ No newline at end of file
@@ -1,19 +1,41 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404, render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.conf import settings
-from django.http import JsonResponse
+from django.http import FileResponse, Http404, HttpResponseNotModified, JsonResponse
+from django.core.files.storage import FileSystemStorage
+from django.core.paginator import Paginator
+from django.db.models import Prefetch, Value, prefetch_related_objects
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.dateparse import parse_date
+from django.utils.http import content_disposition_header
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from cart.cart import Cart
-from .models import Order, OrderItem
+from products.signals import CATALOGUE_TAG
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
 from .forms import OrderCreateForm
-from .emails import send_order_created_email, send_order_confirmed_email, send_order_shipped_email, send_order_delivered_email, send_order_cancelled_email
+from .webhooks import record_event
+from .reports import SALES_TAG, summarise_sales
+from .invoices import invoice_name, invoice_storage
+from .search import search_orders
+from .services import OrderConflict, bulk_transition, update_order
+from .payments import aget_or_create_payment_intent, get_stripe
+from leather_shop.cache import get_or_set, make_key, tag_versions
+from leather_shop.conditional import not_modified, page_etag, with_validator
+from leather_shop.db_router import replica_view
+from leather_shop.media import stream_file
+from leather_shop.metrics import checkout_step
+from leather_shop.pagination import EstimatedCountPaginator
+from .emails import send_in_background, send_order_created_email, send_order_confirmed_email, send_order_shipped_email, send_order_delivered_email, send_order_cancelled_email
 from decimal import Decimal
-import stripe
+from datetime import timedelta
 import json
+import logging
 
-# Set up Stripe
-stripe.api_key = settings.STRIPE_SECRET_KEY
+logger = logging.getLogger(__name__)
 
 
 def get_shipping_cost(method, subtotal):
@@ -96,13 +118,11 @@ def order_create(request):
                     quantity=item['quantity']
                 )
             
-            # Send order created email
-            try:
-                send_order_created_email(order)
-                messages.success(request, f'Order #{order.id} placed successfully! Check your email for confirmation.')
-            except Exception as e:
-                messages.success(request, f'Order #{order.id} placed successfully!')
-                print(f"Email error: {e}")
+            checkout_step('order_created')
+            
+            # Send order created email, without holding up the redirect to payment
+            send_in_background(send_order_created_email, order)
+            messages.success(request, f'Order #{order.id} placed successfully! Check your email for confirmation.')
             
             # Clear the cart
             cart.clear()
@@ -116,6 +136,7 @@ def order_create(request):
             'email': request.user.email,
         }
         form = OrderCreateForm(initial=initial_data)
+        checkout_step('checkout_started')
     
     # Calculate preview totals for each shipping method
     subtotal = sum(Decimal(str(item['price'])) * item['quantity'] for item in cart)
@@ -145,24 +166,120 @@ def order_create(request):
     return render(request, 'orders/order_create.html', context)
 
 
+ORDER_LIST_FIELDS = [
+    'created_at', 'status', 'paid',
+    'full_name', 'email', 'phone',
+    'address_line_1', 'address_line_2', 'city', 'county', 'postcode',
+    'subtotal', 'shipping_cost', 'vat', 'total_amount',
+]
+
+
+def get_order_items_prefetch(item_model=OrderItem, product_fields=()):
+    """Prefetch order items with only the product columns the templates render"""
+    items = item_model.objects.select_related('product').only(
+        'order_id', 'size', 'price', 'quantity',
+        'product__name', 'product__main_image',
+        *[f'product__{field}' for field in product_fields],
+    )
+    return Prefetch('items', queryset=items)
+
+
 @login_required
 def order_detail(request, order_id):
     """View details of a specific order"""
-    order = get_object_or_404(Order, id=order_id, user=request.user)
-    return render(request, 'orders/order_detail.html', {'order': order})
+    # Older orders may have been moved to the archive
+    for order_model, item_model in [(Order, OrderItem), (ArchivedOrder, ArchivedOrderItem)]:
+        order = order_model.objects.filter(id=order_id, user=request.user).first()
+        if order is None:
+            continue
+        # The items show the products as they are now, so the catalogue version counts too
+        etag = page_etag(request, order_model._meta.label, order.id, order.updated_at, *tag_versions([CATALOGUE_TAG]))
+        response = not_modified(request, etag)
+        if response is None:
+            # Items only for a page that is actually rendered
+            prefetch_related_objects([order], get_order_items_prefetch(item_model, ['color', 'material']))
+            response = render(request, 'orders/order_detail.html', {'order': order})
+        return with_validator(response, etag)
+    raise Http404('No order matches the given query.')
 
 
 @login_required
 def order_list(request):
-    """View all orders for the current user"""
-    orders = Order.objects.filter(user=request.user).order_by('-created_at')
-    return render(request, 'orders/order_list.html', {'orders': orders})
+    """View all orders for the current user, live and archived"""
+    # Paginate over (id, created_at) from both tables, then load only the page
+    # (the default ordering must be cleared; compound statements reject ORDER BY in their parts)
+    live_ids = Order.objects.filter(user=request.user).order_by().values_list('id', 'created_at', Value(False))
+    archived_ids = ArchivedOrder.objects.filter(user=request.user).order_by().values_list('id', 'created_at', Value(True))
+    order_ids = live_ids.union(archived_ids, all=True).order_by('-created_at')
+    
+    # Pagination
+    paginator = Paginator(order_ids, 10)  # Show 10 orders per page
+    page_number = request.GET.get('page')
+    page_obj = paginator.get_page(page_number)
+    
+    orders = {}
+    for order_model, item_model, archived in [(Order, OrderItem, False), (ArchivedOrder, ArchivedOrderItem, True)]:
+        ids = [order_id for order_id, _, is_archived in page_obj.object_list if is_archived == archived]
+        if ids:
+            for order in order_model.objects.filter(id__in=ids).only(*ORDER_LIST_FIELDS).prefetch_related(
+                get_order_items_prefetch(item_model)
+            ):
+                orders[(order.id, archived)] = order
+    
+    context = {
+        'orders': [orders[(order_id, bool(is_archived))] for order_id, _, is_archived in page_obj.object_list],
+        'page_obj': page_obj,
+    }
+    return render(request, 'orders/order_list.html', context)
 
 
 @login_required
-def payment(request, order_id):
+def order_invoice(request, order_id, digest=None):
+    """Download the PDF invoice for an order"""
+    lookup = {'id': order_id}
+    if not request.user.is_staff:
+        lookup['user'] = request.user
+    order = (
+        Order.objects.only('user_id', 'invoice_hash').filter(**lookup).first()
+        or ArchivedOrder.objects.only('user_id', 'invoice_hash').filter(**lookup).first()
+    )
+    if order is None:
+        raise Http404('No order matches the given query.')
+    
+    storage = invoice_storage()
+    name = invoice_name(order.invoice_hash) if order.invoice_hash else None
+    if name is None or not storage.exists(name):
+        messages.info(request, 'Your invoice is being prepared. Please check back in a minute.')
+        if order.user_id != request.user.id:
+            return redirect('orders:admin_order_detail', order_id=order.id)
+        return redirect('orders:order_detail', order_id=order.id)
+    
+    # The hashed URL always serves the same bytes, so browsers may keep it forever
+    if digest != order.invoice_hash:
+        return redirect('orders:order_invoice_file', order_id=order.id, digest=order.invoice_hash)
+    
+    etag = f'"{digest}"'
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        if isinstance(storage, FileSystemStorage):
+            response = stream_file(request, storage.path(name), storage.size(name), 'application/pdf')
+        else:
+            # Object storage and the like; invoices are a few KB
+            response = FileResponse(storage.open(name), content_type='application/pdf')
+        response['Content-Disposition'] = content_disposition_header(True, f'invoice-{order.id}.pdf')
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, max_age=365 * 24 * 60 * 60, immutable=True)
+    return response
+
+
+@login_required
+async def payment(request, order_id):
     """Handle Stripe payment for an order"""
-    order = get_object_or_404(Order, id=order_id, user=request.user)
+    # Async so a slow Stripe API holds no worker thread under ASGI.
+    # Reuse the user login_required loaded for the templates' request.user
+    request.user = await request.auser()
+    order = await aget_object_or_404(Order, id=order_id, user=request.user)
     
     # Check if order is already fully paid
     if order.paid:
@@ -184,19 +301,12 @@ def payment(request, order_id):
                 # Charge full amount
                 amount_to_charge = order.total_amount
             
-            # Create Stripe payment intent
-            intent = stripe.PaymentIntent.create(
-                amount=int(amount_to_charge * 100),  # Convert to pence
-                currency='gbp',
-                metadata={
-                    'order_id': order.id,
-                    'user_id': order.user.id,
-                    'payment_type': order.payment_method,
-                }
-            )
+            # Reuse the order's open payment intent where possible
+            intent, created = await aget_or_create_payment_intent(order, amount_to_charge)
             
-            order.stripe_payment_intent = intent.id
-            order.save()
+            if created:
+                await sync_to_async(update_order)(order, stripe_payment_intent=intent.id)
+            checkout_step('payment_started')
             
             return JsonResponse({
                 'clientSecret': intent.client_secret
@@ -204,53 +314,47 @@ def payment(request, order_id):
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=400)
     
+    await sync_to_async(prefetch_related_objects)([order], get_order_items_prefetch())
     context = {
         'order': order,
         'stripe_public_key': settings.STRIPE_PUBLISHABLE_KEY,
         'payment_amount': order.amount_paid_online,
     }
     
-    return render(request, 'orders/payment.html', context)
+    # Context processors read request.user and the session with the sync ORM
+    return await sync_to_async(render)(request, 'orders/payment.html', context)
 
 
 @csrf_exempt
+@require_POST
 def stripe_webhook(request):
-    """Handle Stripe webhook events"""
+    """Verify and record Stripe webhook events; the worker applies them later"""
+    # Never verify against an empty secret: anyone can sign with an empty key
+    if not settings.STRIPE_WEBHOOK_SECRET:
+        logger.error('STRIPE_WEBHOOK_SECRET is not set; rejecting Stripe webhook')
+        return JsonResponse({'error': 'Webhook not configured'}, status=503)
+    
+    stripe = get_stripe()
     payload = request.body
-    sig_header = request.META.get('HTTP_STRIPE_SIGNATURE')
+    sig_header = request.META.get('HTTP_STRIPE_SIGNATURE', '')
     
     try:
-        event = stripe.Webhook.construct_event(
-            payload, sig_header, settings.STRIPE_WEBHOOK_SECRET
+        stripe.WebhookSignature.verify_header(
+            payload.decode('utf-8'), sig_header, settings.STRIPE_WEBHOOK_SECRET,
+            stripe.Webhook.DEFAULT_TOLERANCE
         )
+        event = json.loads(payload)
     except ValueError:
         return JsonResponse({'error': 'Invalid payload'}, status=400)
     except stripe.error.SignatureVerificationError:
         return JsonResponse({'error': 'Invalid signature'}, status=400)
     
-    # Handle payment success
-    if event['type'] == 'payment_intent.succeeded':
-        payment_intent = event['data']['object']
-        order_id = payment_intent['metadata'].get('order_id')
-        payment_type = payment_intent['metadata'].get('payment_type')
-        
-        if order_id:
-            try:
-                order = Order.objects.get(id=order_id)
-                
-                if payment_type == 'partial':
-                    # Partial payment received
-                    order.partial_payment_received = True
-                    order.status = 'processing'
-                else:
-                    # Full payment received
-                    order.paid = True
-                    order.partial_payment_received = True
-                    order.status = 'processing'
-                
-                order.save()
-            except Order.DoesNotExist:
-                pass
+    if not isinstance(event, dict) or not event.get('id'):
+        return JsonResponse({'error': 'Invalid payload'}, status=400)
+    
+    # Acknowledge redeliveries without queueing them twice
+    if not record_event(event):
+        return JsonResponse({'status': 'duplicate'})
     
     return JsonResponse({'status': 'success'})
 
@@ -263,16 +367,25 @@ def admin_order_list(request):
         return redirect('home')
     
     status_filter = request.GET.get('status', '')
-    orders = Order.objects.all().select_related('user').prefetch_related('items__product')
+    if status_filter == 'archived':
+        orders = ArchivedOrder.objects.all().select_related('user').prefetch_related('items__product')
+    else:
+        orders = Order.objects.all().select_related('user').prefetch_related('items__product')
+        if status_filter:
+            orders = orders.filter(status=status_filter)
     
-    if status_filter:
-        orders = orders.filter(status=status_filter)
+    query = request.GET.get('q', '')
+    orders = search_orders(query, orders).order_by('-created_at')
     
-    orders = orders.order_by('-created_at')
+    # Pagination
+    paginator = EstimatedCountPaginator(orders, 50)
+    page_obj = paginator.get_page(request.GET.get('page'))
     
     context = {
-        'orders': orders,
+        'orders': page_obj.object_list,
+        'page_obj': page_obj,
         'status_filter': status_filter,
+        'query': query,
     }
     
     return render(request, 'admin/orders/admin_order_list.html', context)
@@ -285,35 +398,110 @@ def admin_order_detail(request, order_id):
         messages.error(request, 'You do not have permission to access this page.')
         return redirect('home')
     
-    order = get_object_or_404(Order.objects.select_related('user').prefetch_related('items__product'), id=order_id)
+    order = Order.objects.select_related('user').prefetch_related('items__product').filter(id=order_id).first()
+    if order is None:
+        # Archived orders are read-only
+        order = get_object_or_404(
+            ArchivedOrder.objects.select_related('user').prefetch_related('items__product'), id=order_id
+        )
+        if request.method == 'POST':
+            messages.error(request, f'Order #{order.id} is archived and can no longer be changed.')
+            return redirect('orders:admin_order_detail', order_id=order.id)
+        return render(request, 'admin/orders/admin_order_detail.html', {'order': order, 'archived': True})
     old_status = order.status
     
     if request.method == 'POST':
         new_status = request.POST.get('status')
         if new_status in dict(Order.STATUS_CHOICES):
-            order.status = new_status
-            order.save()
+            # Refuse to overwrite a change made since this page was loaded
+            try:
+                if request.POST.get('version', str(order.version)) != str(order.version):
+                    raise OrderConflict(f'Order #{order.id} was changed by another request.')
+                update_order(order, status=new_status)
+            except OrderConflict:
+                messages.error(request, f'Order #{order.id} was updated by someone else. Please review it and try again.')
+                return redirect('orders:admin_order_detail', order_id=order.id)
             
             # Send email based on status change
             try:
                 if old_status == 'pending' and new_status == 'processing':
-                    send_order_confirmed_email(order)
+                    send_in_background(send_order_confirmed_email, order)
                     messages.success(request, f'Order #{order.id} confirmed. Confirmation email sent to customer.')
                 elif new_status == 'shipped':
-                    send_order_shipped_email(order)
+                    send_in_background(send_order_shipped_email, order)
                     messages.success(request, f'Order #{order.id} marked as shipped. Shipping email sent to customer.')
                 elif new_status == 'delivered':
-                    send_order_delivered_email(order)
+                    send_in_background(send_order_delivered_email, order)
                     messages.success(request, f'Order #{order.id} marked as delivered. Delivery confirmation sent to customer.')
                 elif new_status == 'cancelled':
-                    send_order_cancelled_email(order)
+                    send_in_background(send_order_cancelled_email, order)
                     messages.success(request, f'Order #{order.id} cancelled. Cancellation email sent to customer.')
                 else:
                     messages.success(request, f'Order #{order.id} status updated to {order.get_status_display()}.')
-            except Exception as e:
+            except Exception:
                 messages.success(request, f'Order #{order.id} status updated (email sending failed).')
-                print(f"Email error: {e}")
+                logger.exception('Email error for order #%s', order.id)
             
             return redirect('orders:admin_order_detail', order_id=order.id)
     
-    return render(request, 'admin/orders/admin_order_detail.html', {'order': order})
\ No newline at end of file
+    return render(request, 'admin/orders/admin_order_detail.html', {'order': order})
+
+
+@login_required
+@require_POST
+def admin_order_bulk_status(request):
+    """Admin view: Change the status of many orders at once"""
+    if not request.user.is_staff:
+        messages.error(request, 'You do not have permission to access this page.')
+        return redirect('home')
+    
+    status_filter = request.POST.get('status_filter', '')
+    new_status = request.POST.get('status')
+    order_ids = [int(order_id) for order_id in request.POST.getlist('order_ids') if order_id.isdigit()]
+    
+    if new_status not in dict(Order.STATUS_CHOICES) or not order_ids:
+        messages.error(request, 'Select at least one order and a new status.')
+    else:
+        results = bulk_transition(order_ids, new_status)
+        updated = [result for result in results if result['success']]
+        if updated:
+            messages.success(request, f'{len(updated)} order{"s" if len(updated) != 1 else ""} updated to {dict(Order.STATUS_CHOICES)[new_status]}.')
+        for result in results:
+            if result['email_sent'] is False:
+                messages.warning(request, f'Order #{result["order_id"]}: {result["message"]}')
+            elif not result['success']:
+                messages.error(request, f'Order #{result["order_id"]}: {result["message"]}')
+    
+    response = redirect('orders:admin_order_list')
+    if status_filter:
+        response['Location'] += f'?status={status_filter}'
+    return response
+
+
+@login_required
+@replica_view
+def sales_report(request):
+    """Admin view: Sales dashboard, read only from the daily rollups"""
+    if not request.user.is_staff:
+        messages.error(request, 'You do not have permission to access this page.')
+        return redirect('home')
+    
+    # Default to the last 30 days
+    try:
+        end = parse_date(request.GET.get('end', '')) or timezone.localdate()
+        start = parse_date(request.GET.get('start', '')) or end - timedelta(days=29)
+    except ValueError:
+        end = timezone.localdate()
+        start = end - timedelta(days=29)
+    if start > end:
+        start, end = end, start
+    
+    context = {
+        'report': get_or_set(
+            make_key('sales_report', start, end), lambda: summarise_sales(start, end), 3600, tags=[SALES_TAG],
+        ),
+        'start': start,
+        'end': end,
+    }
+    
+    return render(request, 'admin/orders/sales_report.html', context)
@@ -0,0 +1,111 @@
+import logging
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Order, StripeEvent
+from .services import update_order
+from leather_shop.metrics import checkout_step
+
+logger = logging.getLogger(__name__)
+
+
+# Events that keep failing are left for a human to look at in the admin
+MAX_ATTEMPTS = 5
+
+
+def record_event(event):
+    """
+    Store a verified Stripe event for the background worker.
+    Returns False if the event id has already been received.
+    """
+    # A single INSERT; the unique event_id rejects Stripe's redeliveries
+    try:
+        with transaction.atomic():
+            StripeEvent.objects.create(
+                event_id=event['id'],
+                event_type=event.get('type', ''),
+                payload=event,
+                stripe_created=event.get('created') or 0,
+            )
+    except IntegrityError:
+        return False
+    return True
+
+
+def handle_payment_intent_succeeded(event):
+    """Mark the order as paid (in full or in part) without ever moving its status backwards"""
+    payment_intent = event['data']['object']
+    metadata = payment_intent.get('metadata') or {}
+    order_id = metadata.get('order_id')
+    if not order_id:
+        return
+    
+    order = Order.objects.only(
+        'status', 'paid', 'partial_payment_received', 'stripe_payment_intent', 'version'
+    ).filter(id=order_id).first()
+    if order is None:
+        return
+    
+    changes = {}
+    if not order.partial_payment_received:
+        changes['partial_payment_received'] = True
+    if metadata.get('payment_type') != 'partial' and not order.paid:
+        # Full payment received
+        changes['paid'] = True
+    if order.status == 'pending':
+        changes['status'] = 'processing'
+    if not order.stripe_payment_intent:
+        changes['stripe_payment_intent'] = payment_intent['id']
+    
+    # Redelivered or already-applied events are a no-op; a conflicting
+    # write raises OrderConflict and the event is retried on the next pass
+    if changes:
+        update_order(order, **changes)
+        if 'partial_payment_received' in changes:
+            checkout_step('payment_succeeded')
+
+
+EVENT_HANDLERS = {
+    'payment_intent.succeeded': handle_payment_intent_succeeded,
+}
+
+
+def process_pending_events(batch_size=100):
+    """
+    Apply a batch of unprocessed events in Stripe's order.
+    Returns the number of events taken from the queue.
+    """
+    pending = StripeEvent.objects.filter(
+        processed_at__isnull=True,
+        attempts__lt=MAX_ATTEMPTS,
+    ).order_by('stripe_created', 'id')
+    
+    # Let several workers share the queue on databases that support it
+    if connection.features.has_select_for_update_skip_locked:
+        pending = pending.select_for_update(skip_locked=True)
+    
+    with transaction.atomic():
+        events = list(pending[:batch_size])
+        processed = []
+        
+        for event in events:
+            handler = EVENT_HANDLERS.get(event.event_type)
+            try:
+                if handler:
+                    with transaction.atomic():
+                        handler(event.payload)
+            except Exception as e:
+                StripeEvent.objects.filter(id=event.id).update(
+                    attempts=F('attempts') + 1,
+                    last_error=str(e),
+                )
+                logger.exception('Stripe event %s failed', event.event_id)
+            else:
+                processed.append(event.id)
+        
+        StripeEvent.objects.filter(id__in=processed).update(
+            processed_at=timezone.now(),
+            attempts=F('attempts') + 1,
+        )
+    
+    return len(events)
@@ -1,5 +1,16 @@
+import json
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.models import CHANGE, LogEntry
+from django.core.exceptions import ValidationError
+from django.db import router, transaction
+from django.forms.models import BaseModelFormSet
+from django.utils import timezone
+from django.utils.functional import cached_property
+from leather_shop.cache import invalidate
+from leather_shop.pagination import EstimatedCountPaginator
 from .models import Category, Product, ProductReview
+from .signals import CATALOGUE_TAG
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -7,18 +18,56 @@ class CategoryAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('name',)}
     search_fields = ['name']
 
+class PageChoiceField(forms.ModelChoiceField):
+    """Row id field that looks ids up among objects already loaded instead of one SELECT each"""
+    
+    def __init__(self, objects, *args, **kwargs):
+        self.objects = objects
+        super().__init__(*args, **kwargs)
+    
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        obj = self.objects().get(str(value))
+        if obj is None:
+            raise ValidationError(self.error_messages['invalid_choice'], code='invalid_choice')
+        return obj
+
+class ProductChangelistFormSet(BaseModelFormSet):
+    """list_editable formset that checks row ids against the rows it already loaded"""
+    
+    @cached_property
+    def page_objects(self):
+        # get_queryset() is the page being edited, and is evaluated once for the forms anyway
+        return {str(obj.pk): obj for obj in self.get_queryset()}
+    
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        name = self.model._meta.pk.name
+        field = form.fields[name]
+        form.fields[name] = PageChoiceField(
+            lambda: self.page_objects,
+            queryset=field.queryset,
+            initial=field.initial,
+            required=False,
+            widget=field.widget,
+        )
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = [
         'name', 'category', 'price', 'discount_price',
         'stock_quantity', 'available', 'featured', 'created_at'
     ]
+    list_select_related = ['category']
     list_filter = ['available', 'featured', 'gender', 'category', 'created_at']
     list_editable = ['price', 'discount_price', 'stock_quantity', 'available', 'featured']
     prepopulated_fields = {'slug': ('name',)}
-    search_fields = ['name', 'description', 'color']
-    date_hierarchy = 'created_at'
+    # Never scan the description; name and colour carry trigram indexes on PostgreSQL
+    search_fields = ['=slug', 'name', 'color']
     ordering = ['-created_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     fieldsets = (
         ('Basic Information', {
@@ -37,6 +86,58 @@ class ProductAdmin(admin.ModelAdmin):
             'fields': ('main_image', 'image_2', 'image_3')
         }),
     )
+    
+    def get_changelist_formset(self, request, **kwargs):
+        kwargs.setdefault('formset', ProductChangelistFormSet)
+        return super().get_changelist_formset(request, **kwargs)
+    
+    def changelist_view(self, request, extra_context=None):
+        # list_editable rows are queued by save_model/log_change and written together
+        request.pending_product_changes = []
+        request.pending_product_log = []
+        with transaction.atomic(using=router.db_for_write(Product)):
+            response = super().changelist_view(request, extra_context)
+            self.save_pending_changes(request)
+        return response
+    
+    def save_model(self, request, obj, form, change):
+        pending = getattr(request, 'pending_product_changes', None)
+        if pending is None or not change:
+            return super().save_model(request, obj, form, change)
+        pending.append((obj, form.changed_data))
+    
+    def log_change(self, request, obj, message):
+        pending = getattr(request, 'pending_product_log', None)
+        if pending is None:
+            return super().log_change(request, obj, message)
+        pending.append((obj, message))
+    
+    def save_pending_changes(self, request):
+        """One bulk UPDATE for every edited row, then the admin log in bulk"""
+        changes = request.pending_product_changes
+        if not changes:
+            return
+        
+        now = timezone.now()
+        fields = {'updated_at'}
+        for obj, changed_data in changes:
+            obj.updated_at = now
+            fields.update(changed_data)
+        Product.objects.bulk_update([obj for obj, _ in changes], sorted(fields), batch_size=500)
+        # bulk_update() sends no post_save; like the signals, invalidate once committed
+        transaction.on_commit(lambda: invalidate(CATALOGUE_TAG))
+        
+        by_message = {}
+        for obj, message in request.pending_product_log:
+            by_message.setdefault(json.dumps(message), []).append(obj)
+        for message, objs in by_message.items():
+            LogEntry.objects.log_actions(
+                user_id=request.user.pk,
+                queryset=objs,
+                action_flag=CHANGE,
+                change_message=json.loads(message),
+                single_object=False,
+            )
 
 @admin.register(ProductReview)
 class ProductReviewAdmin(admin.ModelAdmin):
@@ -0,0 +1,147 @@
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.contrib.sessions.backends.signed_cookies import SessionStore
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from products.admin import ProductAdmin
+from products.models import Category, Product
+
+
+class BaselineProductAdmin(admin.ModelAdmin):
+    """The product changelist as it was before tuning, for comparison"""
+    list_display = ProductAdmin.list_display
+    list_filter = ProductAdmin.list_filter
+    list_editable = ProductAdmin.list_editable
+    search_fields = ['name', 'description', 'color']
+    date_hierarchy = 'created_at'
+    ordering = ['-created_at']
+
+
+class Rollback(Exception):
+    """Raised to discard the seeded benchmark data"""
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a large catalogue inside a transaction and time the product admin '
+        'changelist (list, search, filter and a list_editable save) before and after tuning.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100000, help='Number of products to seed')
+        parser.add_argument('--categories', type=int, default=20, help='Number of categories to seed')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per scenario')
+        parser.add_argument('--batch-size', type=int, default=5000, help='bulk_create batch size')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                started = time.perf_counter()
+                sample = self.seed(options)
+                self.stdout.write(f'Seeded {options["products"]} products in {time.perf_counter() - started:.1f}s')
+
+                for label, admin_class in [('baseline', BaselineProductAdmin), ('tuned', ProductAdmin)]:
+                    model_admin = admin_class(Product, admin.site)
+                    self.stdout.write(self.style.MIGRATE_HEADING(f'\n{label}'))
+                    for name, make_request in self.scenarios(sample):
+                        self.run_scenario(model_admin, name, make_request, sample['user'], options['repeat'])
+
+                # Never leave benchmark rows behind
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, options):
+        """Bulk-create categories and products, plus a superuser to browse as"""
+        batch_size = options['batch_size']
+        prefix = f'bench-{int(time.time())}'
+
+        categories = Category.objects.bulk_create([
+            Category(name=f'Benchmark {i}', slug=f'{prefix}-{i}')
+            for i in range(options['categories'])
+        ])
+        Product.objects.bulk_create([
+            Product(
+                category=categories[i % len(categories)],
+                name=f'Benchmark Jacket {i}',
+                slug=f'{prefix}-jacket-{i}',
+                description='Handcrafted benchmark jacket. ' * 40,
+                price=Decimal('149.99'),
+                color=['Black', 'Brown', 'Tan', 'Burgundy'][i % 4],
+                available_sizes='S,M,L,XL',
+                stock_quantity=10,
+            )
+            for i in range(options['products'])
+        ], batch_size=batch_size)
+
+        # Give the planner statistics for the freshly seeded tables
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        return {
+            'user': User.objects.create_superuser(prefix, f'{prefix}@example.com', None),
+            'category': categories[len(categories) // 2],
+        }
+
+    def scenarios(self, sample):
+        factory = RequestFactory()
+        runs = iter(range(1, 1000000))
+
+        def get(params=None):
+            return lambda: factory.get('/admin/products/product/', params or {})
+
+        def save_page():
+            # Bump the stock of every product on the first page, as a bulk stock take would
+            products = Product.objects.order_by('-created_at', '-pk')[:ProductAdmin.list_per_page]
+            data = {
+                'form-TOTAL_FORMS': str(len(products)),
+                'form-INITIAL_FORMS': str(len(products)),
+                '_save': 'Save',
+            }
+            bump = next(runs)
+            for i, product in enumerate(products):
+                data.update({
+                    f'form-{i}-id': str(product.pk),
+                    f'form-{i}-price': str(product.price),
+                    f'form-{i}-discount_price': '',
+                    f'form-{i}-stock_quantity': str(10 + bump),
+                    f'form-{i}-available': 'on',
+                })
+            return factory.post('/admin/products/product/', data)
+
+        return [
+            ('changelist', get()),
+            ('search "jacket 4242"', get({'q': 'jacket 4242'})),
+            ('filter by category', get({'category__id__exact': sample['category'].pk})),
+            ('list_editable save (one page)', save_page),
+        ]
+
+    def run_scenario(self, model_admin, name, make_request, user, repeat):
+        timings = []
+        queries = 0
+        for _ in range(repeat):
+            request = make_request()
+            request.user = user
+            request._dont_enforce_csrf_checks = True
+            request.session = SessionStore()
+            request._messages = CookieStorage(request)
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = model_admin.changelist_view(request)
+                if hasattr(response, 'render'):
+                    response.render()
+                timings.append(time.perf_counter() - started)
+            queries = len(context.captured_queries)
+
+        self.stdout.write(
+            f'  {name:<32} median {statistics.median(timings) * 1000:8.1f} ms'
+            f'   {queries:4d} queries   (HTTP {response.status_code})'
+        )
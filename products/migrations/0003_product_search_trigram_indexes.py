@@ -0,0 +1,15 @@
+from django.db import migrations
+from leather_shop.trigram import AddTrigramIndex
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_initial'),
+    ]
+
+    # Serve the admin's name/colour icontains search on PostgreSQL
+    operations = [
+        AddTrigramIndex(name='products_product_name_trgm_idx', table='products_product', column='name'),
+        AddTrigramIndex(name='products_product_color_trgm_idx', table='products_product', column='color'),
+    ]
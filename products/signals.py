@@ -0,0 +1,51 @@
+"""
+Invalidate the cached catalogue (leather_shop.cache) when it changes.
+
+Invalidation waits for the commit: done inside the transaction (the
+admin's, say), a concurrent reader could refill the cache with the old rows
+under the new tag version, to be served until they time out.
+
+Orders drive no tag here because no cached value reads them. The sales
+report caches the rollups, and refresh_sales_rollups() bumps its tag when
+it rebuilds them (orders.reports). Order pages are not cached at all;
+their ETags are built from Order.updated_at (leather_shop.conditional).
+Most order writes are queryset updates (orders.services) that send no
+post_save anyway.
+"""
+from django.core.cache import caches
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from leather_shop.cache import invalidate
+from .models import Category, Product, ProductReview
+
+# Every product list, product page and the home page
+CATALOGUE_TAG = 'catalogue'
+
+
+def reviews_tag(product_id):
+    return f'reviews:{product_id}'
+
+
+def clear_category_menu():
+    # Other processes refresh their category menu within its timeout
+    caches['template_fragments'].delete(make_template_fragment_key('category_menu'))
+
+
+@receiver([post_save, post_delete], sender=Product)
+def product_changed(sender, **kwargs):
+    transaction.on_commit(lambda: invalidate(CATALOGUE_TAG))
+
+
+@receiver([post_save, post_delete], sender=Category)
+def category_changed(sender, **kwargs):
+    transaction.on_commit(lambda: invalidate(CATALOGUE_TAG))
+    transaction.on_commit(clear_category_menu)
+
+
+@receiver([post_save, post_delete], sender=ProductReview)
+def review_changed(sender, instance, **kwargs):
+    tag = reviews_tag(instance.product_id)
+    transaction.on_commit(lambda: invalidate(tag))
@@ -1,32 +1,69 @@
-from django.shortcuts import render, get_object_or_404, redirect
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.core.paginator import Paginator
-from django.db.models import Q, Avg
+from django.db.models import Q, Avg, F
+from leather_shop.cache import aget_or_set, make_key, tag_versions
+from leather_shop.conditional import not_modified, page_etag, with_validator
+from leather_shop.db_router import replica_view
 from .models import Product, Category, ProductReview
+from .signals import CATALOGUE_TAG, reviews_tag
 
 
-def home(request):
+# The catalogue views are async and load their data with the async ORM.
+# Templates still render through sync_to_async: the context processors
+# read request.user and the session with the sync ORM.
+arender = sync_to_async(render)
+
+# Catalogue data is cached (leather_shop.cache) and invalidated when it changes,
+# so the timeout only bounds how long a missed invalidation could last
+CATALOGUE_TIMEOUT = 300
+
+
+def catalogue_etag(request, tags):
+    """ETag for a catalogue page: the URL and the versions of the cache tags its data is under"""
+    return page_etag(request, request.get_full_path(), *tag_versions(tags))
+
+
+acatalogue_etag = sync_to_async(catalogue_etag)
+
+
+@replica_view
+async def home(request):
     """Home page with featured products"""
-    featured_products = Product.objects.filter(featured=True, available=True)[:8]
-    categories = Category.objects.all()
+    # Unchanged since the visitor's copy: answer before loading anything
+    etag = await acatalogue_etag(request, [CATALOGUE_TAG])
+    response = not_modified(request, etag)
+    if response is not None:
+        return with_validator(response, etag)
+    
+    featured_products = await aget_or_set(
+        'home:featured',
+        lambda: list(Product.objects.filter(featured=True, available=True)[:8]),
+        CATALOGUE_TIMEOUT,
+        tags=[CATALOGUE_TAG],
+    )
+    categories = Category.objects.all()  # Left lazy: only queried if the template uses it
     
     context = {
         'featured_products': featured_products,
         'categories': categories,
     }
-    return render(request, 'home.html', context)
+    return with_validator(await arender(request, 'home.html', context), etag)
 
 
-def product_list(request):
+@replica_view
+async def product_list(request):
     """Display all products with filtering and search"""
     products = Product.objects.filter(available=True)
-    categories = Category.objects.all()
+    categories = Category.objects.all()  # Left lazy: the category menu is a cached fragment
     
     # Filter by category
     category_slug = request.GET.get('category')
     if category_slug:
-        category = get_object_or_404(Category, slug=category_slug)
-        products = products.filter(category=category)
+        # Filtering on the slug keeps the whole page one cached lookup; an unknown slug is still a 404
+        products = products.filter(category__slug=category_slug)
     
     # Filter by gender
     gender = request.GET.get('gender')
@@ -65,7 +102,27 @@ def product_list(request):
     # Pagination
     paginator = Paginator(products, 12)  # Show 12 products per page
     page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    
+    etag = await acatalogue_etag(request, [CATALOGUE_TAG])
+    response = not_modified(request, etag)
+    if response is not None:
+        return with_validator(response, etag)
+    
+    def load_page():
+        if category_slug and not Category.objects.filter(slug=category_slug).exists():
+            return None
+        page = paginator.get_page(page_number)
+        return paginator.count, page.number, list(page.object_list)
+    
+    loaded = await aget_or_set(
+        make_key('product_list', sorted(request.GET.lists())), load_page, CATALOGUE_TIMEOUT, tags=[CATALOGUE_TAG],
+    )
+    if loaded is None:
+        raise Http404('No Category matches the given query.')
+    # Rebuild the page around the cached count and products; nothing is queried
+    paginator.count, number, object_list = loaded
+    page_obj = paginator.page(number)
+    page_obj.object_list = object_list
     
     context = {
         'page_obj': page_obj,
@@ -74,26 +131,46 @@ def product_list(request):
         'current_gender': gender,
         'query': query,
     }
-    return render(request, 'products/product_list.html', context)
+    return with_validator(await arender(request, 'products/product_list.html', context), etag)
 
 
-def product_detail(request, slug):
+@replica_view
+async def product_detail(request, slug):
     """Display single product details"""
-    product = get_object_or_404(Product, slug=slug, available=True)
+    def load_product():
+        product = Product.objects.select_related('category').filter(slug=slug, available=True).first()
+        if product is None:
+            return None
+        # Related products (same category)
+        related_products = list(
+            Product.objects.filter(category=product.category, available=True).exclude(id=product.id)[:4]
+        )
+        return product, related_products
     
-    # Get product reviews
-    reviews = product.reviews.all()
-    average_rating = reviews.aggregate(Avg('rating'))['rating__avg']
+    loaded = await aget_or_set(make_key('product_detail', slug), load_product, CATALOGUE_TIMEOUT, tags=[CATALOGUE_TAG])
+    if loaded is None:
+        raise Http404('No Product matches the given query.')
+    product, related_products = loaded
+    
+    # The product and its related products are under the catalogue tag, the reviews under their own
+    etag = await acatalogue_etag(request, [CATALOGUE_TAG, reviews_tag(product.id)])
+    response = not_modified(request, etag)
+    if response is not None:
+        return with_validator(response, etag)
+    
+    # Get product reviews: only the fields the page shows, never the reviewers' User
+    # rows (password hashes, emails), since the cache is shared between processes
+    def load_reviews():
+        reviews = list(product.reviews.values('rating', 'comment', 'created_at', username=F('user__username')))
+        return reviews, product.reviews.aggregate(Avg('rating'))['rating__avg']
+    
+    reviews, average_rating = await aget_or_set(
+        f'product_reviews:{product.id}', load_reviews, CATALOGUE_TIMEOUT, tags=[reviews_tag(product.id)],
+    )
     
     # Get available sizes as list
     available_sizes = [size.strip() for size in product.available_sizes.split(',')]
     
-    # Related products (same category)
-    related_products = Product.objects.filter(
-        category=product.category,
-        available=True
-    ).exclude(id=product.id)[:4]
-    
     context = {
         'product': product,
         'reviews': reviews,
@@ -101,7 +178,7 @@ def product_detail(request, slug):
         'available_sizes': available_sizes,
         'related_products': related_products,
     }
-    return render(request, 'products/product_detail.html', context)
+    return with_validator(await arender(request, 'products/product_detail.html', context), etag)
 
 
 def add_review(request, product_id):
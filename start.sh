@@ -0,0 +1,27 @@
+#!/usr/bin/env bash
+# Start command for the nixpacks deploy, where everything runs in one container:
+# prepare the release, start the Procfile's background processes, then serve.
+set -o errexit
+
+python manage.py migrate --noinput
+python manage.py createcachetable
+python manage.py shell -c 'from django.contrib.auth import get_user_model; import os; User = get_user_model(); username = os.environ.get("DJANGO_SUPERUSER_USERNAME", "admin"); email = os.environ.get("DJANGO_SUPERUSER_EMAIL", "admin@example.com"); password = os.environ.get("DJANGO_SUPERUSER_PASSWORD", "changeme"); User.objects.filter(username=username).exists() or User.objects.create_superuser(username, email, password)'
+python manage.py build_assets
+python manage.py collectstatic --noinput
+
+# Run a background process for as long as the container lives, restarting it if it exits
+keep_running() {
+    while true; do
+        "$@" || echo "$* exited with status $?, restarting" >&2
+        sleep 1
+    done
+}
+
+# Applies queued Stripe webhook events; without it no order is ever marked paid
+keep_running python manage.py process_stripe_events &
+# Renders invoice PDFs into STORAGES['invoices'], which the web process serves
+keep_running python manage.py generate_invoices &
+# Folds newly paid orders into the rollups behind the staff sales report
+keep_running python manage.py refresh_sales_rollups --interval 60 &
+
+exec gunicorn --config gunicorn.conf.py